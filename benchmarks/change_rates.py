@@ -0,0 +1,83 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from salt.logic.prediction_history import PredictionHistory
+from salt.logic.utils import get_labels_from_str, get_strs_from_labels_matrix
+
+
+def create_predictions(
+    num_examples: int, num_classes: int, num_updates: int, flip_rate: float, seed: int
+) -> Tuple[List[str], List[np.ndarray]]:
+    """Multi-label predictions of successive model updates, each flipping a fraction of the previous ones."""
+    rng = np.random.default_rng(seed)
+    classes = [f"class_{i}" for i in range(num_classes)]
+    preds = rng.random((num_examples, num_classes)) < 1 / num_classes
+    preds_list = [preds]
+    for _ in range(num_updates):
+        preds = preds ^ (rng.random(preds.shape) < flip_rate)
+        preds_list.append(preds)
+    return classes, preds_list
+
+
+def measure_strings(classes: List[str], preds_list: List[np.ndarray], length: int) -> Tuple[List[float], int]:
+    """The change rates over lists of labels per row, as computed before the prediction history."""
+    last_preds, latencies = [], []
+    for preds in preds_list:
+        current = pd.Series(get_strs_from_labels_matrix(preds, classes)).apply(get_labels_from_str)
+        start = time.perf_counter()
+        if len(last_preds) == length:
+            df_comp = pd.DataFrame({"last": last_preds[0], "current": current})
+            for label in classes:
+                df_label = df_comp[df_comp.apply(lambda row: label in row["last"] or label in row["current"], axis=1)]
+                _ = (
+                    df_label["last"].apply(lambda labels: label in labels)
+                    != df_label["current"].apply(lambda labels: label in labels)
+                ).mean()
+            last_preds.pop(0)
+            latencies.append(time.perf_counter() - start)
+        last_preds.append(current.copy())
+    return latencies, sum(int(series.memory_usage(deep=True)) for series in last_preds)
+
+
+def measure_history(classes: List[str], preds_list: List[np.ndarray], length: int) -> Tuple[List[float], int]:
+    history, latencies = PredictionHistory(length), []
+    for preds in preds_list:
+        is_full = history.is_full
+        start = time.perf_counter()
+        history.push(preds)
+        if is_full:
+            latencies.append(time.perf_counter() - start)
+    return latencies, history.buffer.nbytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the tracking of the predictions change rates per class")
+    parser.add_argument("--num-examples", type=int, default=1_000_000)
+    parser.add_argument("--num-classes", type=int, default=5)
+    parser.add_argument("--history-length", type=int, default=10)
+    parser.add_argument("--num-updates", type=int, default=3, help="measured updates, after filling the history")
+    parser.add_argument("--flip-rate", type=float, default=0.01)
+    parser.add_argument("--skip-strings", action="store_true", help="skip the (slow) labels strings baseline")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    classes, preds_list = create_predictions(
+        args.num_examples, args.num_classes, args.history_length + args.num_updates - 1, args.flip_rate, args.seed
+    )
+    methods = [("bit-packed ring buffer", measure_history)]
+    if not args.skip_strings:
+        methods.insert(0, ("labels lists", measure_strings))
+    records = []
+    for name, measure in methods:
+        latencies, num_bytes = measure(classes, preds_list, args.history_length)
+        records.append(
+            {"method": name, "update (ms)": 1000 * np.median(latencies), "history (MB)": num_bytes / 2**20}
+        )
+    print(f"{args.num_examples} examples, {args.num_classes} classes, {args.history_length} predictions in history")
+    print(pd.DataFrame(records).to_string(index=False, float_format="{:.1f}".format))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import time
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Tuple
+from salt.constants import TEXT, CLUSTER
+from salt.logic.clusters import Clusters, DistanceType, HIERARCHICAL, K_MEANS, fit_k_means
+
+BLOCK_SIZE = 100_000
+
+
+def create_vectors(
+    path: Path, num_examples: int, num_topics: int, dim: int, seed: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Memory-mapped embeddings around random topic centers (as the vector store's), written by blocks."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_topics, dim)).astype(np.float32)
+    topics = rng.integers(num_topics, size=num_examples)
+    vectors = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(num_examples, dim))
+    for start in range(0, num_examples, BLOCK_SIZE):
+        block_topics = topics[start : start + BLOCK_SIZE]
+        vectors[start : start + BLOCK_SIZE] = centers[block_topics] + rng.normal(size=(len(block_topics), dim))
+    vectors.flush()
+    return np.load(path, mmap_mode="r"), topics
+
+
+def measure(function) -> Tuple[float, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak / 2**20
+
+
+def main():
+    from sklearn.metrics import adjusted_rand_score
+
+    parser = argparse.ArgumentParser(description="Measure the clustering of all the texts vs. of a sample of them")
+    parser.add_argument("--num-examples", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--num-topics", type=int, default=100)
+    parser.add_argument("--num-clusters", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--hierarchical", action="store_true", help="also cluster the sample (semantic distances)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    fit_k_means(np.zeros((10, 2), dtype=np.float32), 2)  # imports scikit-learn, which would be timed otherwise
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for num_examples in args.num_examples:
+            vectors, topics = create_vectors(
+                Path(tmp_dir) / f"vectors_{num_examples}.npy", num_examples, args.num_topics, args.dim, args.seed
+            )
+            df = pd.DataFrame({TEXT: np.arange(num_examples).astype(str)})
+            clusters = Clusters(df, vectors)
+            engines = [K_MEANS] + ([HIERARCHICAL] if args.hierarchical else [])
+            for engine in engines:
+                seconds, peak_mb = measure(
+                    lambda: clusters.run(
+                        num_clusters=args.num_clusters, distance_type=DistanceType.SEMANTIC, engine=engine
+                    )
+                )
+                clustered = clusters.df.index.to_numpy()
+                rows.append(
+                    {
+                        "num_examples": num_examples,
+                        "engine": engine,
+                        "clustered": len(clustered) / num_examples,
+                        "seconds": seconds,
+                        "peak_memory_mb": peak_mb,
+                        "vectors_mb": vectors.nbytes / 2**20,
+                        "ari": adjusted_rand_score(topics[clustered], clusters.df[CLUSTER]),
+                    }
+                )
+                print(rows[-1])
+            del vectors, clusters
+
+    print(pd.DataFrame(rows).to_string(index=False, float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    main()
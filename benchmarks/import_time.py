@@ -0,0 +1,55 @@
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict
+
+# seconds, measured in a fresh interpreter (streamlit itself accounts for most of it)
+IMPORT_TIME_BUDGETS = {
+    "salt.logic.project": 2.0,
+    "salt.view.main": 2.5,
+}
+# loaded on first use only: importing them (or downloading nltk data) at startup slows every streamlit worker
+LAZY_MODULES = ["torch", "sentence_transformers", "transformers", "sklearn", "nltk"]
+
+MEASURE_CODE = """
+import sys, json, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "modules": list(sys.modules)}}))
+"""
+
+
+def measure_import(module: str) -> Dict:
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_CODE.format(module=module)], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_import(module: str, budget: float, repeats: int) -> bool:
+    measurements = [measure_import(module) for _ in range(repeats)]
+    seconds = min(measurement["seconds"] for measurement in measurements)
+    loaded = {name.split(".")[0] for name in measurements[0]["modules"]}
+    eager_modules = [name for name in LAZY_MODULES if name in loaded]
+
+    print(f"{module}: {seconds:.2f}s (budget {budget:.2f}s)")
+    if eager_modules:
+        print(f"  imported eagerly: {', '.join(eager_modules)}")
+    return seconds <= budget and not eager_modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the app entry points against a budget")
+    parser.add_argument("--repeats", type=int, default=3, help="measure each import this many times, keep the best")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the budgets (e.g. on slow CI machines)")
+    args = parser.parse_args()
+
+    results = [
+        check_import(module, budget * args.scale, args.repeats) for module, budget in IMPORT_TIME_BUDGETS.items()
+    ]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
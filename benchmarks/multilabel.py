@@ -0,0 +1,61 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from typing import Tuple
+from salt.logic.classifier import MULTILABEL_ENGINES
+
+
+def create_dataset(
+    num_examples: int, num_classes: int, dim: int, labels_per_example: float, seed: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectors as noisy sums of the centers of their classes, and their (rows, classes) labels matrix."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_classes, dim))
+    labels_matrix = rng.random((num_examples, num_classes)) < labels_per_example / num_classes
+    labels_matrix[np.arange(num_examples), rng.integers(num_classes, size=num_examples)] = True
+    vectors = labels_matrix @ centers + rng.normal(scale=3.0, size=(num_examples, dim))
+    return vectors.astype(np.float32), labels_matrix, centers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the fit and predict times of the multi-label engines")
+    parser.add_argument("--num-labeled", type=int, default=2_000)
+    parser.add_argument("--num-unlabeled", type=int, default=100_000)
+    parser.add_argument("--num-classes", type=int, nargs="+", default=[5, 20, 50, 100])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--labels-per-example", type=float, default=1.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    records = []
+    for num_classes in args.num_classes:
+        vectors, labels_matrix, _ = create_dataset(
+            args.num_labeled + args.num_unlabeled, num_classes, args.dim, args.labels_per_example, args.seed
+        )
+        train, test = slice(None, args.num_labeled), slice(args.num_labeled, None)
+        classes = [f"class_{i}" for i in range(num_classes)]
+        for engine, engine_class in MULTILABEL_ENGINES.items():
+            classifier = engine_class()
+            start = time.perf_counter()
+            classifier.fit(vectors[train], labels_matrix[train], classes)
+            fit_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            preds = classifier.get_labels_matrix(classifier.predict_probs(vectors[test]))
+            predict_seconds = time.perf_counter() - start
+            records.append(
+                {
+                    "classes": num_classes,
+                    "engine": engine,
+                    "fit (s)": fit_seconds,
+                    "predict (s)": predict_seconds,
+                    "exact match": (preds == labels_matrix[test]).all(axis=1).mean(),
+                    "label accuracy": (preds == labels_matrix[test]).mean(),
+                }
+            )
+    print(f"{args.num_labeled} labeled, {args.num_unlabeled} predicted examples of dimension {args.dim}")
+    print(pd.DataFrame(records).to_string(index=False, float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    main()
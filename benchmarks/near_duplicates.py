@@ -0,0 +1,121 @@
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from salt.constants import TEXT, CLUSTER
+from salt.logic.project import get_working_dir
+from salt.logic.vector_store import load_vector_store
+from salt.logic.embeddings import TEXTS_KEY
+from salt.logic.clusters import Clusters, DistanceType, MAX_EXAMPLES, get_lexical_features
+from salt.logic.near_duplicates import get_minhash_signatures, find_near_duplicates
+
+BLOCK_SIZE = 1_000
+
+
+def create_texts(num_texts: int, templated_fraction: float, seed: int) -> List[str]:
+    """Random texts of 20 words, some of them from templates with 1 to 10 slots filled with random words."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"word{i}" for i in range(20_000)])
+    templates = rng.choice(vocabulary, (max(num_texts // 100, 1), 20))
+    num_templated = int(num_texts * templated_fraction)
+    words = rng.choice(vocabulary, (num_texts, 20))
+    num_slots = rng.integers(1, 11, size=num_templated)
+    is_template_word = np.arange(20) >= num_slots[:, None]
+    template_words = templates[rng.integers(len(templates), size=num_templated)]
+    words[:num_templated] = np.where(is_template_word, template_words, words[:num_templated])
+    return [" ".join(row) for row in words[rng.permutation(num_texts)]]
+
+
+def get_exact_pairs(texts: List[str], distance_threshold: float) -> np.ndarray:
+    """The (first, second) pairs of texts whose exact lexical cosine distance is below the threshold."""
+    from sklearn.preprocessing import normalize
+
+    features = normalize(get_lexical_features(texts))
+    pairs = []
+    for start in range(0, len(texts), BLOCK_SIZE):
+        similarities = (features[start : start + BLOCK_SIZE] @ features.T).tocoo()
+        rows = similarities.row + start
+        is_pair = (similarities.data > 1 - distance_threshold) & (rows < similarities.col)
+        pairs.append(np.stack([rows[is_pair], similarities.col[is_pair]], axis=1))
+    return np.concatenate(pairs)
+
+
+def get_pairs_metrics(pairs: np.ndarray, groups: np.ndarray) -> Dict[str, float]:
+    """The recall of the exact pairs by the groups, and the fraction of the grouped pairs that are exact pairs."""
+    is_grouped = groups[pairs[:, 0]] == groups[pairs[:, 1]]
+    group_sizes = np.bincount(pd.factorize(groups)[0]).astype(np.int64)
+    num_grouped_pairs = (group_sizes * (group_sizes - 1) // 2).sum()
+    return {
+        "exact_pairs": len(pairs),
+        "recall": is_grouped.mean() if len(pairs) else np.nan,
+        "precision": is_grouped.sum() / num_grouped_pairs if num_grouped_pairs else np.nan,
+    }
+
+
+def compare_on_sample(texts: List[str], distance_thresholds: List[float]) -> pd.DataFrame:
+    """The near-duplicates engine vs. the exact lexical distances (pairs and hierarchical clusters) on a sample."""
+    clusters = Clusters(pd.DataFrame({TEXT: texts}), np.zeros((len(texts), 1), dtype=np.float32))
+    signatures = get_minhash_signatures(texts)
+    rows = []
+    for distance_threshold in distance_thresholds:
+        pairs = get_exact_pairs(texts, distance_threshold)
+        groups, _ = find_near_duplicates(*signatures, distance_threshold)
+        rows.append({"engine": "near-duplicates", "distance_threshold": distance_threshold})
+        rows[-1].update(get_pairs_metrics(pairs, groups))
+        clusters.run(distance_threshold=distance_threshold, distance_type=DistanceType.LEXICAL)
+        rows.append({"engine": "hierarchical (exact)", "distance_threshold": distance_threshold})
+        rows[-1].update(get_pairs_metrics(pairs, clusters.df.sort_index()[CLUSTER].to_numpy()))
+    return pd.DataFrame(rows)
+
+
+def measure_scale(texts: List[str], distance_threshold: float) -> Dict[str, float]:
+    start = time.perf_counter()
+    signatures = get_minhash_signatures(texts)
+    signatures_seconds = time.perf_counter() - start
+    tracemalloc.start()  # of the hashing only, as tracing the tokenization of the texts would slow it down
+    start = time.perf_counter()
+    groups, _ = find_near_duplicates(*signatures, distance_threshold)
+    lsh_seconds = time.perf_counter() - start
+    lsh_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    group_sizes = np.bincount(pd.factorize(groups)[0])
+    return {
+        "num_texts": len(texts),
+        "signatures_seconds": signatures_seconds,
+        "lsh_seconds": lsh_seconds,
+        "signatures_mb": sum(array.nbytes for array in signatures) / 2**20,
+        "lsh_peak_memory_mb": lsh_peak / 2**20,
+        "duplicated_texts": group_sizes[group_sizes > 1].sum() / len(texts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the near-duplicates engine: recall on a sample, and scale")
+    parser.add_argument("--project", help="a project's texts (default: synthetic texts)")
+    parser.add_argument("--num-texts", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--templated-fraction", type=float, default=0.3)
+    parser.add_argument("--distance-thresholds", type=float, nargs="+", default=[0.1, 0.2, 0.3, 0.5])
+    parser.add_argument("--scale-distance-threshold", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.project:
+        all_texts = list(load_vector_store(get_working_dir(args.project))[TEXTS_KEY])
+        sample_indices = np.random.default_rng(args.seed).permutation(len(all_texts))[:MAX_EXAMPLES]
+        sample, datasets = [all_texts[i] for i in sample_indices], [all_texts]
+    else:
+        sample = create_texts(MAX_EXAMPLES, args.templated_fraction, args.seed)
+        datasets = [create_texts(num_texts, args.templated_fraction, args.seed) for num_texts in args.num_texts]
+
+    print(f"Recall of the pairs below the threshold, on {len(sample):,} texts:")
+    print(compare_on_sample(sample, args.distance_thresholds).to_string(index=False, float_format="{:.3f}".format))
+    get_minhash_signatures(["warm up"])  # imports scikit-learn, which would be timed otherwise
+    rows = [measure_scale(texts, args.scale_distance_threshold) for texts in datasets]
+    print(f"Scale, at the distance threshold {args.scale_distance_threshold}:")
+    print(pd.DataFrame(rows).to_string(index=False, float_format="{:.3f}".format))
+
+
+if __name__ == "__main__":
+    main()
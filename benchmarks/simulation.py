@@ -0,0 +1,212 @@
+import json
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from datetime import datetime
+from itertools import product
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+from salt.constants import TEXT, DATE, NA, SKIP
+from salt.logic.label_store import LabelStore
+from salt.logic.active_learning import ActiveLearningMechanism
+from salt.logic.batch_selection import DIVERSITY_METHODS, DEFAULT_DIVERSITY_METHOD
+from salt.logic.classifier import MULTILABEL_ENGINES, DEFAULT_MULTILABEL_ENGINE
+from salt.logic.query_strategies import QUERY_STRATEGIES, get_query_strategy_name
+from salt.logic.utils import get_strs_from_labels_matrix
+from salt.logic.project import get_working_dir
+from salt.logic.vector_store import load_vector_store
+from salt.logic.embeddings import VECTORS_KEY, LABELS_KEY
+import step_latency
+import multilabel
+
+
+@dataclass
+class SimulationConfig:
+    diversity_method: str = DEFAULT_DIVERSITY_METHOD
+    batch_size: int = 1
+    incremental: bool = True
+    multilabel_engine: str = DEFAULT_MULTILABEL_ENGINE
+    query_strategy: Optional[str] = None  # the default of the mode
+
+
+@dataclass
+class Dataset:
+    vectors: np.ndarray
+    gold: np.ndarray  # labels strings
+    labels_matrix: np.ndarray  # (rows, classes)
+    classes: List[str]
+
+
+def create_dataset(gold: np.ndarray, vectors: np.ndarray) -> Dataset:
+    label_store = LabelStore.from_strs(gold)
+    classes = label_store.gold_classes
+    return Dataset(vectors, gold, label_store.gold[:, label_store.get_classes_indices(classes)], classes)
+
+
+def load_dataset(args: argparse.Namespace) -> Dataset:
+    if args.project:  # the texts of a project with gold labels, embedded beforehand
+        embeddings = load_vector_store(get_working_dir(args.project))
+        gold = np.array(embeddings[LABELS_KEY], dtype=object)
+        is_labeled = (gold != NA) & (gold != SKIP)
+        return create_dataset(gold[is_labeled], np.asarray(embeddings[VECTORS_KEY])[is_labeled])
+    if args.multilabel:
+        vectors, labels_matrix, _ = multilabel.create_dataset(
+            args.num_examples, args.num_classes, args.dim, args.labels_per_example, args.seed
+        )
+        classes = [f"class_{i}" for i in range(args.num_classes)]
+        return create_dataset(get_strs_from_labels_matrix(labels_matrix, classes), vectors)
+    _, vectors, gold = step_latency.create_dataset(args.num_examples, args.num_classes, args.dim, args.seed)
+    return create_dataset(gold.astype(object), vectors)
+
+
+def split_dataset(dataset: Dataset, test_size: float, seed: int) -> Tuple[Dataset, Dataset]:
+    indices = np.random.default_rng(seed).permutation(len(dataset.gold))
+    num_test = int(len(indices) * test_size)
+    return tuple(
+        Dataset(dataset.vectors[rows], dataset.gold[rows], dataset.labels_matrix[rows], dataset.classes)
+        for rows in [indices[num_test:], indices[:num_test]]
+    )
+
+
+def get_seed_indices(dataset: Dataset, seed: int) -> np.ndarray:
+    """A positive example of each class and, in multi-label datasets, a negative one too (so each class is fittable)."""
+    rng = np.random.default_rng(seed)
+    indices = [rng.choice(np.flatnonzero(column)) for column in dataset.labels_matrix.T]
+    if dataset.labels_matrix.sum(axis=1).max() > 1:
+        indices += [rng.choice(np.flatnonzero(~column)) for column in dataset.labels_matrix.T if not column.all()]
+    return np.unique(indices)
+
+
+def evaluate(al: ActiveLearningMechanism, test: Dataset) -> Dict[str, float]:
+    model = al.model
+    labels_matrix = model.get_labels_matrix(model.predict_probs(test.vectors))
+    gold_matrix = test.labels_matrix[:, [test.classes.index(cls) for cls in model.classes]]
+    is_correct = labels_matrix == gold_matrix
+    return {"accuracy": is_correct.all(axis=1).mean(), "label_accuracy": is_correct.mean()}
+
+
+def simulate(config: SimulationConfig, pool: Dataset, test: Dataset, args: argparse.Namespace) -> List[Dict]:
+    """Labels the examples chosen by the mechanism with their gold labels, as an annotator would."""
+    df = pd.DataFrame({TEXT: np.arange(len(pool.gold)).astype(str), DATE: datetime(1, 1, 1)})
+    label_store = LabelStore(len(pool.gold))
+    seed_indices = get_seed_indices(pool, args.seed)
+    label_store.set_gold(seed_indices, pool.gold[seed_indices])
+    al = ActiveLearningMechanism(
+        df,
+        pool.vectors,
+        label_store,
+        incremental=config.incremental,
+        batch_size=config.batch_size,
+        diversity_method=config.diversity_method,
+        multilabel_engine=config.multilabel_engine,
+        query_strategy=config.query_strategy,
+    )
+
+    timings = {"fit": 0.0, "update": 0.0}
+
+    def timed(name: str, method):
+        def timed_method(*method_args):
+            start = time.perf_counter()
+            result = method(*method_args)
+            timings[name] += time.perf_counter() - start
+            return result
+
+        return timed_method
+
+    al.fit_model, al.compute_update = timed("fit", al.fit_model), timed("update", al.compute_update)
+    records = []
+    tracemalloc.start()
+    label = None
+    for step in range(args.num_labels + 1):
+        timings.update(fit=0.0, update=0.0)
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        al.step(label)
+        step_seconds = time.perf_counter() - start
+        record = {
+            **asdict(config),
+            "step": step,
+            "num_labels": al.num_anns,
+            "step_ms": 1000 * step_seconds,
+            "fit_ms": 1000 * timings["fit"],
+            "predict_select_ms": 1000 * (timings["update"] - timings["fit"]),  # scoring and picking the next texts
+            "peak_memory_mb": tracemalloc.get_traced_memory()[1] / 2**20,
+        }
+        if step % args.eval_every == 0 or step == args.num_labels or al.curr_ann_index is None:
+            record.update(evaluate(al, test))
+        records.append(record)
+        if al.curr_ann_index is None:  # all labeled
+            break
+        label = pool.gold[al.curr_ann_index]
+    tracemalloc.stop()
+    return records
+
+
+def write_results(records: List[Dict], path: str) -> None:
+    if Path(path).suffix == ".json":
+        with open(path, "w") as f:
+            json.dump(pd.DataFrame(records).replace({np.nan: None}).to_dict("records"), f, indent=2)
+    else:
+        pd.DataFrame(records).to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Simulate active-learning sessions with an annotator labeling by gold labels, without an encoder"
+    )
+    parser.add_argument("--project", help="a project with gold labels (default: synthetic vectors and labels)")
+    parser.add_argument("--multilabel", action="store_true", help="synthetic multi-label dataset")
+    parser.add_argument("--num-examples", type=int, default=20_000)
+    parser.add_argument("--num-classes", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--labels-per-example", type=float, default=1.5)
+    parser.add_argument("--test-size", type=float, default=0.2, help="held-out fraction of the examples")
+    parser.add_argument("--num-labels", type=int, default=200, help="simulated annotations per session")
+    parser.add_argument("--eval-every", type=int, default=20)
+    parser.add_argument("--diversity-methods", nargs="+", default=[DEFAULT_DIVERSITY_METHOD], choices=DIVERSITY_METHODS)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1])
+    parser.add_argument(
+        "--multilabel-engines", nargs="+", default=[DEFAULT_MULTILABEL_ENGINE], choices=MULTILABEL_ENGINES
+    )
+    parser.add_argument("--query-strategies", nargs="+", default=[None], choices=QUERY_STRATEGIES)
+    parser.add_argument("--full-refit", action="store_true", help="also simulate without warm-started fits")
+    parser.add_argument("--output", default="simulation.csv", help="per-step results, as .csv or .json")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pool, test = split_dataset(load_dataset(args), args.test_size, args.seed)
+    import sklearn.linear_model  # noqa: F401 (imported on the first fit otherwise, which would be timed)
+
+    is_multilabel = pool.labels_matrix.sum(axis=1).max() > 1
+    records = []
+    for diversity_method, batch_size, incremental, engine, query_strategy in product(
+        args.diversity_methods,
+        args.batch_sizes,
+        [True, False] if args.full_refit else [True],
+        args.multilabel_engines if is_multilabel else [DEFAULT_MULTILABEL_ENGINE],
+        [get_query_strategy_name(name, is_multilabel) for name in args.query_strategies],
+    ):
+        config = SimulationConfig(diversity_method, batch_size, incremental, engine, query_strategy)
+        print(f"Simulating {config}...")
+        records += simulate(config, pool, test, args)
+    write_results(records, args.output)
+
+    df = pd.DataFrame(records)
+    config_columns = list(asdict(SimulationConfig()))
+    summary = df.groupby(config_columns).agg(
+        num_labels=("num_labels", "max"),
+        median_step_ms=("step_ms", "median"),
+        median_fit_ms=("fit_ms", "median"),
+        peak_memory_mb=("peak_memory_mb", "max"),
+        final_accuracy=("accuracy", "last"),
+        final_label_accuracy=("label_accuracy", "last"),
+    )
+    print(summary.to_string(float_format="{:.3f}".format))
+    print(f"Per-step results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
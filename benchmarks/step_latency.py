@@ -0,0 +1,83 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import List, Tuple
+from salt.logic.label_store import LabelStore
+from salt.logic.active_learning import ActiveLearningMechanism
+from salt.constants import TEXT, DATE
+
+
+def create_dataset(
+    num_examples: int, num_classes: int, dim: int, seed: int
+) -> Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+    """Noisy gaussian clusters, one per class, in the shape of a project state."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_classes, dim))
+    gold = rng.integers(num_classes, size=num_examples)
+    vectors = (centers[gold] + rng.normal(scale=6.0, size=(num_examples, dim))).astype(np.float32)
+    df = pd.DataFrame({TEXT: [f"text {i}" for i in range(num_examples)]})
+    df[DATE] = datetime(1, 1, 1)
+    return df, vectors, np.array([f"class_{i}" for i in range(num_classes)])[gold]
+
+
+def measure_steps(
+    num_examples: int, num_classes: int, dim: int, num_labels: int, incremental: bool, seed: int
+) -> Tuple[List[float], List[float]]:
+    """Labels the examples chosen by the mechanism with their gold labels, and returns the steps and fits latencies."""
+    df, vectors, gold = create_dataset(num_examples, num_classes, dim, seed)
+    label_store = LabelStore(num_examples)
+    classes, seed_indices = np.unique(gold, return_index=True)  # a seed example per class
+    label_store.set_gold(seed_indices, classes)
+
+    al = ActiveLearningMechanism(df, vectors, label_store, incremental=incremental)
+    al.step()
+    fit_model, fit_latencies = al.fit_model, []
+
+    def timed_fit_model(*args):
+        start = time.perf_counter()
+        model = fit_model(*args)
+        fit_latencies.append(time.perf_counter() - start)
+        return model
+
+    al.fit_model = timed_fit_model
+    latencies = []
+    while len(latencies) < num_labels and al.curr_ann_index is not None:
+        label = gold[al.curr_ann_index]
+        start = time.perf_counter()
+        al.step(label)
+        latencies.append(time.perf_counter() - start)
+    return latencies, fit_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Measure the latency of active-learning steps vs. the labeled set size"
+    )
+    parser.add_argument("--num-examples", type=int, default=20_000)
+    parser.add_argument("--num-classes", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--num-labels", type=int, default=500)
+    parser.add_argument("--report-every", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    mode2latencies = {
+        mode: measure_steps(args.num_examples, args.num_classes, args.dim, args.num_labels, incremental, args.seed)
+        for mode, incremental in [("full refit", False), ("incremental", True)]
+    }
+    num_steps = min(len(latencies) for latencies, _ in mode2latencies.values())
+    records = []
+    for start in range(0, num_steps, args.report_every):
+        record = {"num_labels": start + args.num_classes}
+        for mode, (latencies, fit_latencies) in mode2latencies.items():
+            record[f"{mode} step (ms)"] = 1000 * np.median(latencies[start : start + args.report_every])
+            record[f"{mode} fit (ms)"] = 1000 * np.median(fit_latencies[start : start + args.report_every])
+        record["fit speedup"] = record["full refit fit (ms)"] / record["incremental fit (ms)"]
+        records.append(record)
+    print(pd.DataFrame(records).to_string(index=False, float_format="{:.1f}".format))
+
+
+if __name__ == "__main__":
+    main()
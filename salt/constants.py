@@ -1,7 +1,6 @@
 from pathlib import Path
 
 TEXT = "text"
-VECTOR = "vector"
 DATE = "dt"
 LABEL = "label"
 PRED = "pred"
@@ -20,4 +19,15 @@ EDITED_DF_KEY = "edited_df"
 
 PROJECTS_DIR = str(Path.home().joinpath("SaltProjects"))
 EMBEDDINGS_FILE_NAME = "embeddings.pkl"
+VECTORS_FILE_NAME = "vectors.bin"
+RECORDS_FILE_NAME = "records.parquet"
+METADATA_FILE_NAME = "metadata.json"
+CHECKPOINT_FILE_NAME = "checkpoint.json"
+SETTINGS_FILE_NAME = "settings.json"
+PARTS_DIR_NAME = "parts"
+DISTANCES_DIR_NAME = "distances"
+EMBEDDINGS_CACHE_DIR = str(Path(PROJECTS_DIR).joinpath(".cache", "embeddings"))
+EMBEDDINGS_CACHE_MAX_SIZE = 2 * 1024**3  # bytes
+SEGMENTATION_CACHE_DIR = str(Path(PROJECTS_DIR).joinpath(".cache", "sentences"))
+SEGMENTATION_CACHE_MAX_SIZE = 512 * 1024**2  # bytes
 DUMP_INTERVAL = 10
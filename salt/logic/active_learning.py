@@ -1,23 +1,81 @@
+import numpy as np
 import pandas as pd
+from copy import deepcopy
+from collections import deque
 from datetime import datetime
+from dataclasses import dataclass
+from concurrent.futures import Executor, Future
 from typing import List, Dict, Optional
-from salt.logic.classifier import create_classifier, Prediction, Classifier
-from salt.constants import NA, SKIP, LABEL, PRED, VECTOR, TEXT, DATE, LABELS_SEP
-from salt.logic.utils import get_prob_col, get_labels_from_str, get_classes_from_labels
+from salt.logic.classifier import create_classifier, Prediction, Classifier, DEFAULT_MULTILABEL_ENGINE
+from salt.logic.prediction_history import PredictionHistory, HISTORY_LENGTH
+from salt.logic.uncertainty_index import UncertaintyIndex, POOL_SIZE, RESCORE_INTERVAL
+from salt.logic.batch_selection import select_batch, DEFAULT_DIVERSITY_METHOD
+from salt.logic.label_store import LabelStore, LabelsSnapshot, UNLABELED
+from salt.constants import SKIP, LABEL, PRED, TEXT, DATE
+from salt.logic.utils import get_prob_col
+
+
+@dataclass
+class ModelUpdate:
+    model: Classifier
+    index: UncertaintyIndex
+    probs: Optional[np.ndarray]  # of the whole dataset, on full passes
+    batch: np.ndarray
+    num_anns: int  # number of annotations the model was fitted on
+
+
+def rebuild_uncertainty_index(
+    index: UncertaintyIndex, model: Classifier, probs: np.ndarray, status: np.ndarray, query_strategy: Optional[str]
+) -> None:
+    unlabeled_indices = np.flatnonzero(status == UNLABELED)
+    scope2scores = model.get_scopes_uncertainties(probs[unlabeled_indices], query_strategy)
+    index.rebuild(unlabeled_indices, scope2scores, model.get_query_scope(query_strategy))
 
 
 class ActiveLearningMechanism:
-    def __init__(self, df: pd.DataFrame):
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        vectors: np.ndarray,
+        label_store: LabelStore,
+        incremental: bool = True,
+        pool_size: int = POOL_SIZE,
+        rescore_interval: int = RESCORE_INTERVAL,
+        batch_size: int = 1,
+        diversity_method: str = DEFAULT_DIVERSITY_METHOD,
+        executor: Optional[Executor] = None,
+        history_length: int = HISTORY_LENGTH,
+        multilabel_engine: str = DEFAULT_MULTILABEL_ENGINE,
+        query_strategy: Optional[str] = None,
+    ):
         self.df = df
+        self.vectors = vectors
+        self.label_store = label_store
+        self.incremental = incremental  # warm-start each fit from the previous model
+        self.multilabel_engine = multilabel_engine
+        self.query_strategy = query_strategy  # None: the default strategy of the single-label or multi-label mode
         self.model: Optional[Classifier] = None
         self.curr_ann_index: Optional[int] = None
-        self.last_preds = [self.df[PRED]]
+        self.uncertainty_index = UncertaintyIndex(pool_size, rescore_interval)
+        self.batch_size = batch_size  # examples queued for annotation per model update
+        self.diversity_method = diversity_method
+        self.queue = deque()
+        self.executor = executor
+        self.background = executor is not None  # fit and predict in the executor, serving the latest completed model
+        self.update_future: Optional[Future] = None
+        self.model_num_anns = 0  # number of annotations the model was fitted on
+        self.num_label_changes = 0
+        self.fitted_label_changes = -1  # the number of label changes when the last update was started
+        self.predictions_num_anns: Optional[int] = None  # number of annotations when the whole dataset was predicted
+        self.predictions_version = 0
+        self.history_version = 0
+        self.prediction_history = PredictionHistory(history_length)  # of the whole dataset predictions
+        self.prediction_history.push(self.label_store.preds)
         self.history = []
 
     @property
     def labels(self) -> List[str]:
-        labels = get_classes_from_labels(self.df[LABEL].dropna())
-        return sorted([label for label in labels if label not in [NA, SKIP]])
+        return self.label_store.gold_classes
 
     @property
     def label2index(self) -> Dict[str, int]:
@@ -25,7 +83,7 @@ class ActiveLearningMechanism:
 
     @property
     def num_anns(self) -> int:
-        return len(self.df[self.df[LABEL] != NA])
+        return self.label_store.num_annotated
 
     @property
     def next_example(self) -> str:
@@ -39,90 +97,163 @@ class ActiveLearningMechanism:
 
     @property
     def is_multilabel(self) -> bool:
-        return any(self.df[LABEL].str.contains(LABELS_SEP))
+        return self.label_store.is_multilabel
 
     @property
     def is_single_label_fittable(self) -> bool:
         return len(self.labels) > 1
 
-    @staticmethod
-    def is_multi_label_class_fittable(label, annotations) -> bool:
-        return not all(label in get_labels_from_str(labels_str) for labels_str in annotations)
+    def is_multi_label_class_fittable(self, label: str) -> bool:
+        return self.label_store.count_negatives(label) > 0
+
+    def set_query_strategy(self, query_strategy: Optional[str]) -> None:
+        if query_strategy != self.query_strategy:
+            self.query_strategy = query_strategy
+            self.uncertainty_index.request_full_pass()  # the scores of the other strategy are not comparable
 
     def get_ann_options(self) -> List[str]:
         return self.labels + [SKIP]
 
-    def get_train_df(self) -> pd.DataFrame:
-        return self.df[~self.df[LABEL].isin([SKIP, NA])]
-
     def set_label(self, index: int, label: str) -> None:
-        if self.df.loc[index, LABEL] == label:
+        self.apply_labels(np.array([index]), np.array([label], dtype=object))
+
+    def set_labels(self, df: pd.DataFrame) -> None:
+        self.apply_labels(df.index.to_numpy(), df[LABEL].to_numpy())
+
+    def apply_labels(self, indices: np.ndarray, labels_strs: np.ndarray) -> None:
+        """Sets the labels strings of the rows at once: a single assignment, timestamp and invalidation for all."""
+        labels_strs = self.label_store.get_canonical_strs(labels_strs)  # e.g. a "B,A" edit is unchanged "A,B" labels
+        is_changed = labels_strs != self.label_store.get_gold_strs(indices)
+        if not is_changed.any():
             return
 
-        self.df.loc[index, LABEL] = label
-        self.df.loc[index, DATE] = datetime.now()
+        indices = indices[is_changed]
+        self.label_store.set_gold(indices, labels_strs[is_changed])
+        self.df.loc[indices, DATE] = datetime.now()
+        self.num_label_changes += 1
+        if (indices != self.curr_ann_index).any():  # labeled outside the annotation queue (e.g. in the review step)
+            self.queue.clear()
         self.curr_ann_index = None
 
-    def set_labels(self, df: pd.DataFrame) -> None:
-        df_original = self.df.loc[df.index]
-        for _, row in df[df[LABEL] != df_original[LABEL]].iterrows():
-            self.set_label(row.name, row[LABEL])
+    def fit_model(self, model: Optional[Classifier], labels: LabelsSnapshot) -> Classifier:
+        is_multilabel = bool((labels.train_matrix.sum(axis=1) > 1).any())
+        if not self.incremental or model is None or model.is_multilabel != is_multilabel:
+            model = create_classifier(is_multilabel, self.multilabel_engine)
+        model.fit(self.vectors[labels.train_indices], labels.train_matrix, labels.classes, warm_start=self.incremental)
+        return model
 
     def fit(self) -> None:
-        df_train = self.get_train_df()
-        self.model = create_classifier(self.is_multilabel)
-        self.model.fit(df_train[VECTOR].to_list(), df_train[LABEL].to_list())
+        self.model = self.fit_model(self.model, self.label_store.get_snapshot())
 
-    def predict(self, df: pd.DataFrame) -> Prediction:
-        vectors = df[VECTOR].to_list()
+    def predict(self, vectors: np.ndarray) -> Prediction:
         return self.model.predict(vectors)
 
-    def predict_and_update(self, df: pd.DataFrame) -> None:
-        prediction = self.predict(df)
-        df[PRED] = prediction.labels
-        for index, cls in enumerate(self.labels):
-            df[get_prob_col(cls)] = prediction.class2probs[cls]
+    def predict_and_update(self, df: pd.DataFrame, vectors: np.ndarray) -> None:
+        probs = self.model.predict_probs(vectors)
+        df[PRED] = self.model.get_labels(probs)
+        for index, cls in enumerate(self.model.classes):
+            df[get_prob_col(cls)] = probs[:, index]
+
+    def write_predictions(self, probs: np.ndarray) -> None:
+        self.label_store.set_predictions(self.model.classes, self.model.get_labels_matrix(probs), probs)
+
+    def update_predictions(self) -> None:
+        """Predicts the whole dataset with the latest model, and rebuilds the uncertainty index from its predictions."""
+        if self.model is None:
+            self.fit()
+        probs = self.model.predict_probs(self.vectors)
+        rebuild_uncertainty_index(
+            self.uncertainty_index, self.model, probs, self.label_store.status, self.query_strategy
+        )
+        self.write_predictions(probs)
+        self.predictions_num_anns = self.num_anns
+        self.predictions_version += 1
+
+    def compute_update(
+        self, model: Optional[Classifier], labels: LabelsSnapshot, index: UncertaintyIndex
+    ) -> ModelUpdate:
+        """Fits the model on the given labels and picks the next batch: safe to run in the background on copies."""
+        model = self.fit_model(model, labels)
+        probs = None
+        index.set_scope(model.get_query_scope(self.query_strategy))  # e.g. the next focus class
+        index.keep(labels.status[index.candidates] == UNLABELED)
+        if index.is_full_pass_due:
+            probs = model.predict_probs(self.vectors)
+            rebuild_uncertainty_index(index, model, probs, labels.status, self.query_strategy)
+        else:
+            candidates_probs = model.predict_probs(self.vectors[index.candidates])
+            index.rescore(model.get_uncertainties(candidates_probs, self.query_strategy))
+
+        batch = select_batch(
+            self.vectors, index.candidates, index.scores, labels.train_indices, self.batch_size, self.diversity_method
+        )
+        return ModelUpdate(model, index, probs, batch, int(np.count_nonzero(labels.status != UNLABELED)))
+
+    def apply_update(self, update: ModelUpdate) -> None:
+        self.model = update.model
+        self.model_num_anns = update.num_anns
+        self.uncertainty_index = update.index
+        if update.probs is not None:
+            self.write_predictions(update.probs)
+            self.predictions_num_anns = update.num_anns
+            self.predictions_version += 1
+
+        is_unlabeled = self.label_store.status[update.batch] == UNLABELED
+        self.queue = deque(int(i) for i in update.batch[is_unlabeled] if i != self.curr_ann_index)
+
+    @property
+    def is_updating(self) -> bool:
+        return self.update_future is not None
+
+    def submit_update(self) -> None:
+        if self.update_future is None and self.fitted_label_changes != self.num_label_changes:
+            self.fitted_label_changes = self.num_label_changes
+            labels = self.label_store.get_snapshot()
+            model, index = deepcopy(self.model), deepcopy(self.uncertainty_index)
+            self.update_future = self.executor.submit(self.compute_update, model, labels, index)
+
+    def apply_finished_update(self, wait: bool = False) -> None:
+        if self.update_future is not None and (wait or self.update_future.done()):
+            future, self.update_future = self.update_future, None
+            self.apply_update(future.result())
+
+    def get_most_uncertain_candidate(self) -> Optional[int]:
+        index = self.uncertainty_index
+        index.keep(self.label_store.status[index.candidates] == UNLABELED)
+        return int(index.candidates[index.scores.argmax()]) if len(index.candidates) else None
+
+    def get_next_index(self) -> Optional[int]:
+        if self.queue:
+            return self.queue.popleft()
+        next_index = self.get_most_uncertain_candidate()  # by the latest completed model, while the next one is fitted
+        if next_index is None and self.is_updating:
+            self.apply_finished_update(wait=True)
+            return self.queue.popleft() if self.queue else None
+        return next_index
 
     def step(self, label: str = None) -> None:
         if label:
             self.set_label(self.curr_ann_index, label)
 
-        self.fit()
-        self.predict_and_update(self.df)
+        self.apply_finished_update()
+        if not self.queue and (self.model is None or not self.background):
+            self.apply_finished_update(wait=True)
+            self.fitted_label_changes = self.num_label_changes
+            self.apply_update(self.compute_update(self.model, self.label_store.get_snapshot(), self.uncertainty_index))
+        self.curr_ann_index = self.get_next_index()
+        if self.background and not self.queue:
+            self.submit_update()  # fit on the latest labels while the current example is annotated
 
-        df_na = self.df[self.df[LABEL] == NA]
-        if df_na.empty:
-            self.curr_ann_index = None
-            return
+    def update_history_and_get_change_df(self) -> Optional[pd.DataFrame]:
+        if self.history_version == self.predictions_version:  # the whole dataset was not predicted again since
+            return pd.DataFrame(self.history) if self.history else None
+        self.history_version = self.predictions_version
 
-        class2probs = {cls: df_na[get_prob_col(cls)].to_list() for cls in self.labels}
-        self.curr_ann_index = df_na.iloc[self.model.get_min_confidence_index(class2probs)].name
+        change_rates = self.prediction_history.push(self.label_store.preds)
+        if change_rates is None:
+            return None
 
-    def update_history_and_get_change_df(self) -> Optional[pd.DataFrame]:
-        df_comp = pd.DataFrame(
-            {
-                "last": self.last_preds[0],
-                "current": self.df[PRED].apply(get_labels_from_str),
-            }
-        )
-        records = []
         for label in self.labels:
-            df_label = df_comp[df_comp.apply(lambda row: label in row["last"] or label in row["current"], axis=1)]
-            change_rate = (
-                df_label["last"].apply(lambda labels: label in labels)
-                != df_label["current"].apply(lambda labels: label in labels)
-            ).mean()
-            records.append(
-                {
-                    "num_labels": self.num_anns,
-                    "class": label,
-                    "change_rate": change_rate,
-                }
-            )
-        self.last_preds.append(self.df[PRED].apply(get_labels_from_str).copy())
-        if len(self.last_preds) > 10:
-            self.last_preds.pop(0)
-            self.history += records
-            return pd.DataFrame(self.history)
-
-        return None
+            change_rate = change_rates[self.label_store.class2index[label]]
+            self.history.append({"num_labels": self.num_anns, "class": label, "change_rate": change_rate})
+        return pd.DataFrame(self.history)
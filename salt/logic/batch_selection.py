@@ -0,0 +1,67 @@
+import numpy as np
+from typing import Callable, Dict
+
+TOP_UNCERTAIN = "top-uncertain"
+K_CENTER = "k-center"
+DEFAULT_DIVERSITY_METHOD = TOP_UNCERTAIN
+K_CENTER_POOL_FACTOR = 10  # k-center picks k out of the k * factor most uncertain candidates
+DISTANCES_BLOCK_SIZE = 4_096
+
+BatchSelector = Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray, int], np.ndarray]
+DIVERSITY_METHODS: Dict[str, BatchSelector] = {}
+
+
+def register_diversity_method(name: str) -> Callable:
+    def register(select: BatchSelector) -> BatchSelector:
+        DIVERSITY_METHODS[name] = select
+        return select
+
+    return register
+
+
+@register_diversity_method(TOP_UNCERTAIN)
+def select_top_uncertain(
+    vectors: np.ndarray, candidates: np.ndarray, scores: np.ndarray, labeled_indices: np.ndarray, k: int
+) -> np.ndarray:
+    return candidates[np.argsort(-scores, kind="stable")[:k]]
+
+
+@register_diversity_method(K_CENTER)
+def select_k_center(
+    vectors: np.ndarray, candidates: np.ndarray, scores: np.ndarray, labeled_indices: np.ndarray, k: int
+) -> np.ndarray:
+    """
+    Greedy k-center over the most uncertain candidates: starting from the labeled rows as centers, each pick is
+    the candidate with the largest cosine distance to its nearest center.
+    """
+    from sklearn.preprocessing import normalize
+
+    top = np.argsort(-scores, kind="stable")[: k * K_CENTER_POOL_FACTOR]
+    candidates = candidates[top]
+    candidates_vectors = normalize(np.asarray(vectors[candidates], dtype=np.float32))
+
+    min_distances = np.full(len(candidates), np.inf, dtype=np.float32)
+    for start in range(0, len(labeled_indices), DISTANCES_BLOCK_SIZE):
+        centers = normalize(np.asarray(vectors[labeled_indices[start : start + DISTANCES_BLOCK_SIZE]], np.float32))
+        min_distances = np.minimum(min_distances, (1 - candidates_vectors @ centers.T).min(axis=1))
+
+    selected = []
+    for _ in range(min(k, len(candidates))):
+        pick = int(min_distances.argmax())  # the most uncertain one, while there are no centers (ties)
+        selected.append(pick)
+        min_distances = np.minimum(min_distances, 1 - candidates_vectors @ candidates_vectors[pick])
+        min_distances[selected] = -np.inf
+    return candidates[selected]
+
+
+def select_batch(
+    vectors: np.ndarray,
+    candidates: np.ndarray,
+    scores: np.ndarray,
+    labeled_indices: np.ndarray,
+    k: int,
+    diversity_method: str = DEFAULT_DIVERSITY_METHOD,
+) -> np.ndarray:
+    if diversity_method not in DIVERSITY_METHODS:
+        raise ValueError(f"Unknown diversity method: {diversity_method} (available: {', '.join(DIVERSITY_METHODS)})")
+    return DIVERSITY_METHODS[diversity_method](vectors, candidates, scores, labeled_indices, k)
@@ -1,90 +1,192 @@
 import numpy as np
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Type
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
-from sklearn.linear_model import LogisticRegression
-from sklearn.multioutput import MultiOutputClassifier
-from salt.logic.utils import (
-    get_labels_from_str,
-    get_str_from_labels,
-    get_classes_from_labels,
-)
+from salt.logic.utils import get_strs_from_labels_matrix
+from salt.logic.query_strategies import QUERY_STRATEGIES, get_query_strategy_name, get_query_scope
 
 THRESHOLD = 0.5
+PREDICT_BLOCK_SIZE = 65_536  # rows, so memory-mapped vectors are never fully loaded (as float64) at once
+PER_CLASS = "per-class"
+BATCHED = "batched"
+DEFAULT_MULTILABEL_ENGINE = BATCHED
+
+MULTILABEL_ENGINES: Dict[str, Type["MultiLabelClassifier"]] = {}
+
+
+def register_multilabel_engine(name: str) -> Callable:
+    def register(engine: Type["MultiLabelClassifier"]) -> Type["MultiLabelClassifier"]:
+        MULTILABEL_ENGINES[name] = engine
+        return engine
+
+    return register
 
 
 @dataclass
 class Prediction:
-    labels: List[str]
-    class2probs: Dict[str, List[float]]
+    labels: np.ndarray
+    class2probs: Dict[str, np.ndarray]
 
 
 class Classifier(ABC):
+    is_multilabel: bool
+    classes: List[str]
+    num_labels: Optional[int]  # fitted on
+
     @abstractmethod
-    def fit(self, vectors: List[List[float]], labels: List[str]) -> None:
+    def fit(self, vectors: np.ndarray, labels_matrix: np.ndarray, classes: List[str], warm_start: bool = False) -> None:
+        """
+        Fits on a boolean (rows, classes) labels matrix, whose columns are the given (sorted) classes.
+        With `warm_start`, starts from the previous coefficients, unless the set of classes has changed.
+        """
         raise NotImplementedError()
 
     @abstractmethod
-    def predict(self, vectors: List[List[float]]) -> Prediction:
+    def predict_block_probs(self, vectors: np.ndarray) -> np.ndarray:
         raise NotImplementedError()
 
     @abstractmethod
-    def get_min_confidence_index(self, class2probs: Dict[str, List[float]]) -> int:
+    def get_labels_matrix(self, probs: np.ndarray) -> np.ndarray:
         raise NotImplementedError()
 
+    def get_uncertainties(self, probs: np.ndarray, query_strategy: Optional[str] = None) -> np.ndarray:
+        """The uncertainty of the classifier in each row of `probs` (the higher, the more uncertain)."""
+        query_strategy = get_query_strategy_name(query_strategy, self.is_multilabel)
+        return QUERY_STRATEGIES[query_strategy](probs, self.is_multilabel, self.num_labels)
+
+    def get_query_scope(self, query_strategy: Optional[str] = None) -> Optional[int]:
+        """The scope of the uncertainties of the strategy (see `SCOPED_STRATEGIES`), None for unscoped strategies."""
+        query_strategy = get_query_strategy_name(query_strategy, self.is_multilabel)
+        return get_query_scope(query_strategy, len(self.classes), self.num_labels)
+
+    def get_scopes_uncertainties(
+        self, probs: np.ndarray, query_strategy: Optional[str] = None
+    ) -> Dict[Optional[int], np.ndarray]:
+        """The uncertainties of each row of `probs` in every scope of the strategy (e.g. with each focus class)."""
+        query_strategy = get_query_strategy_name(query_strategy, self.is_multilabel)
+        if get_query_scope(query_strategy, len(self.classes), self.num_labels) is None:
+            return {None: self.get_uncertainties(probs, query_strategy)}
+        strategy = QUERY_STRATEGIES[query_strategy]
+        return {scope: strategy(probs, self.is_multilabel, scope) for scope in range(len(self.classes))}
+
+    def predict_probs(self, vectors: np.ndarray) -> np.ndarray:
+        blocks = [
+            self.predict_block_probs(vectors[start : start + PREDICT_BLOCK_SIZE])
+            for start in range(0, len(vectors), PREDICT_BLOCK_SIZE)
+        ]
+        return np.concatenate(blocks) if blocks else np.zeros((0, len(self.classes)))
+
+    def get_labels(self, probs: np.ndarray) -> np.ndarray:
+        return get_strs_from_labels_matrix(self.get_labels_matrix(probs), self.classes)
+
+    def predict(self, vectors: np.ndarray) -> Prediction:
+        probs = self.predict_probs(vectors)
+        class2probs = {cls: probs[:, index] for index, cls in enumerate(self.classes)}
+        return Prediction(self.get_labels(probs), class2probs)
+
 
 class SingleLabelClassifier(Classifier):
+    is_multilabel = False
+
     def __init__(self):
+        from sklearn.linear_model import LogisticRegression
+
         self.model = LogisticRegression(class_weight="balanced")
+        self.num_labels = None
 
-    def fit(self, vectors: List[List[float]], labels: List[str]) -> None:
+    def fit(self, vectors: np.ndarray, labels_matrix: np.ndarray, classes: List[str], warm_start: bool = False) -> None:
+        self.num_labels = len(labels_matrix)
+        labels = np.array(classes, dtype=object)[labels_matrix.argmax(axis=1)]
+        is_fitted = hasattr(self.model, "classes_")
+        self.model.warm_start = warm_start and is_fitted and self.model.classes_.tolist() == sorted(set(labels))
         self.model.fit(vectors, labels)
 
-    def predict(self, vectors: List[List[float]]) -> Prediction:
-        classes = self.model.classes_
-        vectors_probs = self.model.predict_proba(vectors)
-        labels = classes[vectors_probs.argmax(axis=1)].tolist()
-        class2probs = {cls: vectors_probs[:, index].tolist() for index, cls in enumerate(classes)}
-        return Prediction(labels, class2probs)
+    @property
+    def classes(self) -> List[str]:
+        return self.model.classes_.tolist()
 
-    def get_min_confidence_index(self, class2probs: Dict[str, List[float]]) -> int:
-        probs = np.stack(list(class2probs.values())).T
-        return int(probs.max(axis=1).argmin())
+    def predict_block_probs(self, vectors: np.ndarray) -> np.ndarray:
+        return self.model.predict_proba(vectors)
+
+    def get_labels_matrix(self, probs: np.ndarray) -> np.ndarray:
+        labels_matrix = np.zeros(probs.shape, dtype=bool)
+        labels_matrix[np.arange(len(probs)), probs.argmax(axis=1)] = True
+        return labels_matrix
+
+    def get_labels(self, probs: np.ndarray) -> np.ndarray:
+        return self.model.classes_.astype(object)[probs.argmax(axis=1)]
 
 
 class MultiLabelClassifier(Classifier):
+    """Independent per-class decisions, thresholded the same way by all the multi-label engines."""
+
+    is_multilabel = True
+
+    def get_labels_matrix(self, probs: np.ndarray) -> np.ndarray:
+        is_positive = probs > THRESHOLD
+        has_no_positive = ~is_positive.any(axis=1)
+        is_positive[has_no_positive, probs[has_no_positive].argmax(axis=1)] = True  # then, the most probable class
+        return is_positive
+
+
+@register_multilabel_engine(PER_CLASS)
+class PerClassMultiLabelClassifier(MultiLabelClassifier):
     def __init__(self):
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.multioutput import MultiOutputClassifier
+
         self.model = MultiOutputClassifier(LogisticRegression(class_weight="balanced"))
         self.classes = None
         self.num_labels = None
 
-    def fit(self, vectors: List[List[float]], labels: List[str]) -> None:
-        self.num_labels = len(labels)
-        self.classes = get_classes_from_labels(labels)
+    def fit(self, vectors: np.ndarray, labels_matrix: np.ndarray, classes: List[str], warm_start: bool = False) -> None:
+        warm_start = warm_start and classes == self.classes
+        self.num_labels = len(labels_matrix)
+        self.classes = list(classes)
+        labels_matrix = labels_matrix.astype(np.int64)
+
+        if not warm_start:
+            self.model.fit(vectors, labels_matrix)
+            return
+
+        # MultiOutputClassifier.fit clones its estimators, so warm-start the fitted ones directly
+        for estimator, class_labels in zip(self.model.estimators_, labels_matrix.T):
+            estimator.warm_start = True
+            estimator.fit(vectors, class_labels)
 
-        class2index = {cls: index for index, cls in enumerate(self.classes)}
-        labels_matrix = np.zeros((len(labels), len(class2index)))
-        for i, labels_str in enumerate(labels):
-            for label in get_labels_from_str(labels_str):
-                labels_matrix[i, class2index[label]] = 1
+    def predict_block_probs(self, vectors: np.ndarray) -> np.ndarray:
+        return np.array([label_probs[:, 1] for label_probs in self.model.predict_proba(vectors)]).T
 
-        self.model.fit(vectors, labels_matrix)
 
-    def predict(self, vectors: List[List[float]]) -> Prediction:
-        vectors_probs = np.array([label_probs[:, 1] for label_probs in self.model.predict_proba(vectors)]).T
+@register_multilabel_engine(BATCHED)
+class BatchedMultiLabelClassifier(MultiLabelClassifier):
+    """
+    The same per-class logistic regressions as PerClassMultiLabelClassifier, fitted in lockstep by a vectorized L-BFGS:
+    each iteration evaluates all the classes with a single matrix product, and so does each prediction.
+    """
+
+    def __init__(self):
+        self.coef: Optional[np.ndarray] = None  # (features + intercept, classes)
+        self.classes = None
+        self.num_labels = None
+
+    def fit(self, vectors: np.ndarray, labels_matrix: np.ndarray, classes: List[str], warm_start: bool = False) -> None:
+        from salt.logic.one_vs_rest import fit_one_vs_rest
 
-        labels = []
-        for probs in vectors_probs:
-            pred_classes = [self.classes[index] for index in np.argwhere(probs > THRESHOLD).flatten()]
-            labels.append(get_str_from_labels(pred_classes) if pred_classes else self.classes[probs.argmax()])
+        initial_coef = self.coef if warm_start and classes == self.classes else None
+        self.num_labels = len(labels_matrix)
+        self.classes = list(classes)
+        self.coef = fit_one_vs_rest(vectors, labels_matrix, initial_coef)
 
-        class2probs = {cls: vectors_probs[:, index].tolist() for index, cls in enumerate(self.classes)}
-        return Prediction(labels, class2probs)
+    def predict_block_probs(self, vectors: np.ndarray) -> np.ndarray:
+        from scipy.special import expit
 
-    def get_min_confidence_index(self, class2probs: Dict[str, List[float]]) -> int:
-        focus_class = self.classes[self.num_labels % len(self.classes)]
-        return int(abs(np.array(class2probs[focus_class]) - THRESHOLD).argmin())
+        return expit(vectors @ self.coef[:-1].astype(np.float32) + self.coef[-1].astype(np.float32))
 
 
-def create_classifier(is_multilabel: bool) -> Classifier:
-    return MultiLabelClassifier() if is_multilabel else SingleLabelClassifier()
+def create_classifier(is_multilabel: bool, multilabel_engine: str = DEFAULT_MULTILABEL_ENGINE) -> Classifier:
+    if multilabel_engine not in MULTILABEL_ENGINES:
+        raise ValueError(
+            f"Unknown multi-label engine: {multilabel_engine} (available: {', '.join(MULTILABEL_ENGINES)})"
+        )
+    return MULTILABEL_ENGINES[multilabel_engine]() if is_multilabel else SingleLabelClassifier()
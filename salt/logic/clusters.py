@@ -1,11 +1,13 @@
+import os
+import hashlib
 import numpy as np
 import pandas as pd
 from enum import Enum
-from typing import List
-from sklearn.cluster import AgglomerativeClustering
-from sklearn.metrics.pairwise import cosine_distances
-from sklearn.feature_extraction.text import CountVectorizer
-from salt.constants import TEXT, VECTOR, CLUSTER, MEAN_DISTANCE
+from functools import cached_property
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from salt.constants import TEXT, CLUSTER, MEAN_DISTANCE
+from salt.logic.near_duplicates import get_minhash_signatures, find_near_duplicates, get_duplicates_report
 
 
 class DistanceType(Enum):
@@ -15,82 +17,357 @@ class DistanceType(Enum):
 
 
 MAX_EXAMPLES = 10_000
+DISTANCES_DTYPE = np.float16
+BLOCK_SIZE = 256  # rows of the distance matrix computed at once
 
+HIERARCHICAL = "hierarchical"  # complete linkage of a sample of MAX_EXAMPLES texts
+K_MEANS = "k-means"  # mini-batch k-means of all the texts, by their embeddings
+NEAR_DUPLICATES = "near-duplicates"  # MinHash locality-sensitive hashing of all the texts, by their words
+CLUSTERING_ENGINES = [HIERARCHICAL, K_MEANS, NEAR_DUPLICATES]
+K_MEANS_BLOCK_SIZE = 8_192  # rows of the embeddings normalized and fitted at once
+K_MEANS_EPOCHS = 2
+EXAMPLE = "example"
+SIZE = "size"
+COHESION = "cohesion"
+MINHASH_NAME = "minhash"
+SHINGLES_NAME = "shingles"
+
+
+def get_condensed_index(num_examples: int, rows: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """The positions of the (row, column) pairs (row != column) in a condensed (upper-triangular) distance matrix."""
+    first, second = np.minimum(rows, columns), np.maximum(rows, columns)
+    return num_examples * first - first * (first + 1) // 2 + second - first - 1
+
+
+def get_condensed_cosine_distances(vectors) -> np.ndarray:
+    """The condensed cosine distances between the rows of a dense or sparse matrix, computed by blocks of rows."""
+    from sklearn.preprocessing import normalize
+
+    vectors = normalize(vectors)
+    num_examples = vectors.shape[0]
+    distances = np.empty(num_examples * (num_examples - 1) // 2, dtype=DISTANCES_DTYPE)
+    for start in range(0, num_examples, BLOCK_SIZE):
+        similarities = vectors[start : start + BLOCK_SIZE] @ vectors[start:].T
+        similarities = similarities.toarray() if hasattr(similarities, "toarray") else similarities
+        block_distances = np.clip(1 - similarities, 0, 2)
+        for row in range(len(block_distances)):
+            index = start + row
+            offset = get_condensed_index(num_examples, index, index + 1) if index + 1 < num_examples else 0
+            distances[offset : offset + num_examples - index - 1] = block_distances[row, row + 1 :]
+    return distances
+
+
+def get_lexical_features(texts: List[str]):
+    from sklearn.feature_extraction.text import CountVectorizer
 
-def get_lexical_distances(texts: List[str]) -> np.array:
     vectorizer = CountVectorizer(ngram_range=(1, 2))
-    vectors = vectorizer.fit_transform(texts)
-    return cosine_distances(vectors).astype(np.float16)
+    return vectorizer.fit_transform(texts)
+
+
+def get_mean_cosine_distances(features, clusters: np.ndarray) -> np.ndarray:
+    """
+    The mean cosine distance of each of the (normalized) rows of a dense or sparse matrix to the rows of its cluster
+    (itself included): one minus its similarity to the sum of its cluster's rows, over the cluster's size.
+    """
+    from scipy import sparse
+
+    num_rows = features.shape[0]
+    _, inverse, counts = np.unique(clusters, return_inverse=True, return_counts=True)
+    membership = sparse.csr_matrix((np.ones(num_rows), (inverse, np.arange(num_rows))), shape=(len(counts), num_rows))
+    sums = membership @ features
+    if sparse.issparse(features):  # the sums at the non-zero features of each row only
+        features, sums = features.tocoo(), sums.tocoo()
+        num_columns = np.int64(features.shape[1])
+        sums_keys = sums.row * num_columns + sums.col
+        order = np.argsort(sums_keys)
+        positions = order[np.searchsorted(sums_keys, inverse[features.row] * num_columns + features.col, sorter=order)]
+        similarities = np.bincount(features.row, weights=features.data * sums.data[positions], minlength=num_rows)
+    else:
+        similarities = np.einsum("ij,ij->i", features, sums[inverse])
+    return np.clip(1 - similarities / counts[inverse], 0, 2)
+
+
+def save_array(path: Path, array: np.ndarray) -> None:
+    """Save a cache file named `<name>_<key>.npy`, removing the files of the same name with other keys."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp.npy")
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+    name = path.stem.rsplit("_", 1)[0]
+    for other_path in path.parent.glob(f"{name}_*.npy"):
+        # "lexical_*" also matches "lexical_tree_<key>.npy", and "<name>_<key>.tmp.npy" is a write in progress
+        if other_path != path and other_path.stem.rsplit("_", 1)[0] == name and "." not in other_path.stem:
+            other_path.unlink(missing_ok=True)
+
+
+def cut_tree_by_count(tree: np.ndarray, num_clusters: int) -> np.ndarray:
+    """
+    The clusters after the first merges of a linkage tree, as AgglomerativeClustering(n_clusters) (fcluster's maxclust
+    may return fewer clusters when merges are tied, e.g. at the lexical distance 1 of texts without common words).
+    """
+    num_examples = len(tree) + 1
+    parents = np.arange(2 * num_examples - 1)
+    for i, (first, second) in enumerate(tree[: max(num_examples - num_clusters, 0), :2].astype(int)):
+        parents[first] = parents[second] = num_examples + i
+    for node in range(2 * num_examples - 2, -1, -1):  # the parents of the nodes are after them
+        parents[node] = parents[parents[node]]
+    return parents[:num_examples]
+
+
+def get_normalized_block(vectors: np.ndarray, start: int, stop: int) -> np.ndarray:
+    from sklearn.preprocessing import normalize
+
+    return normalize(np.asarray(vectors[start:stop], dtype=np.float32))
+
+
+def fit_k_means(vectors: np.ndarray, num_clusters: int, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical mini-batch k-means of the rows of a (possibly memory-mapped) embeddings matrix, which is only read by
+    blocks, so the memory grows with the number of rows by the clusters and the distances only.
+    Returns the cluster and the cosine distance to its cluster's centroid of each row.
+    """
+    from sklearn.cluster import MiniBatchKMeans
+
+    num_examples = len(vectors)
+    rng = np.random.default_rng(seed)
+    num_init_examples = min(num_examples, max(3 * num_clusters, K_MEANS_BLOCK_SIZE))
+    init_indices = np.sort(rng.choice(num_examples, num_init_examples, replace=False))
+    model = MiniBatchKMeans(num_clusters, batch_size=K_MEANS_BLOCK_SIZE, n_init=1, random_state=seed)
+    model.partial_fit(get_normalized_block(vectors[init_indices], 0, num_init_examples))
+    starts = np.arange(0, num_examples, K_MEANS_BLOCK_SIZE)
+    for _ in range(K_MEANS_EPOCHS):
+        for start in rng.permutation(starts):
+            model.partial_fit(get_normalized_block(vectors, start, start + K_MEANS_BLOCK_SIZE))
+
+    centroids = get_normalized_block(model.cluster_centers_, 0, num_clusters)
+    clusters, distances = np.empty(num_examples, dtype=np.int32), np.empty(num_examples, dtype=np.float32)
+    for start in starts:
+        similarities = get_normalized_block(vectors, start, start + K_MEANS_BLOCK_SIZE) @ centroids.T
+        block_clusters = similarities.argmax(axis=1)
+        clusters[start : start + K_MEANS_BLOCK_SIZE] = block_clusters
+        distances[start : start + K_MEANS_BLOCK_SIZE] = 1 - similarities[np.arange(len(similarities)), block_clusters]
+    return clusters, np.clip(distances, 0, 2)
 
 
 class Clusters:
-    def __init__(self, df: pd.DataFrame):
-        df_sample = df.sample(MAX_EXAMPLES, random_state=0) if len(df) > MAX_EXAMPLES else df
-        lexical_distances = get_lexical_distances(df_sample[TEXT].to_list())
-        semantic_distances = cosine_distances(df_sample[VECTOR].to_list())
-        self.type2distances = {
-            DistanceType.LEXICAL: lexical_distances,
-            DistanceType.SEMANTIC: semantic_distances,
-            DistanceType.MIXED: (lexical_distances + semantic_distances) / 2,
-        }
+    """
+    Clusters of the texts: of a sample of them by their lexical or semantic distances (or the mean of both), or of all
+    of them by their embeddings. The df of the clustered texts keeps the index of the project's df.
+    Each distance matrix of the sample is computed on first use only, in condensed form, and cached to `cache_dir`.
+    """
+
+    def __init__(self, df: pd.DataFrame, vectors: np.ndarray, cache_dir: Optional[str] = None):
+        self.df_all = df[[TEXT]]
+        self.df_sample = df[[TEXT]].sample(MAX_EXAMPLES, random_state=0) if len(df) > MAX_EXAMPLES else df[[TEXT]]
+        self.vectors = vectors
+        self.cache_dir = cache_dir
+        self.type2features = {}
+        self.type2distances: Dict[DistanceType, np.ndarray] = {}
+        self.type2tree: Dict[DistanceType, np.ndarray] = {}
+        self.signatures: Optional[Tuple[np.ndarray, np.ndarray]] = None
 
         self.distance_type = DistanceType.LEXICAL
-        self.df = df_sample[[TEXT]].copy().reset_index(drop=True)
-        self.cluster_dfs = None
-        self.update_clusters([0] * len(self.df))
+        self.engine = HIERARCHICAL
+        self.df = self.df_sample.copy()
+        self.cluster_offsets = None
+        self.overview: Optional[pd.DataFrame] = None
+        self.csv: Optional[bytes] = None
+        self.duplicates_report_csv: Optional[bytes] = None
+        self.update_clusters(np.zeros(len(self.df), dtype=int))
 
     @property
     def num_examples(self):
         return len(self.df)
 
     @property
-    def num_clusters(self):
-        return len(self.cluster_dfs)
+    def num_sample_examples(self):
+        return len(self.df_sample)
+
+    def get_num_examples(self, engine: str) -> int:
+        """The number of texts an engine clusters."""
+        return self.num_sample_examples if engine == HIERARCHICAL else len(self.df_all)
 
     @property
-    def distances(self) -> np.array:
-        return self.type2distances[self.distance_type]
+    def num_clusters(self):
+        return len(self.cluster_offsets) - 1
+
+    @cached_property
+    def sample_key(self) -> str:
+        texts_hashes = pd.util.hash_pandas_object(self.df_sample[TEXT], index=False).to_numpy()
+        return hashlib.sha1(texts_hashes.tobytes()).hexdigest()
+
+    @cached_property
+    def texts_key(self) -> str:
+        texts_hashes = pd.util.hash_pandas_object(self.df_all[TEXT], index=False).to_numpy()
+        return hashlib.sha1(texts_hashes.tobytes()).hexdigest()
+
+    def get_cache_path(self, name: str, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return Path(self.cache_dir).joinpath(f"{name}_{key[:16]}.npy")
+
+    def get_signatures(self) -> Tuple[np.ndarray, np.ndarray]:
+        """The MinHash signatures of all the texts and the number of their shingles, computed once."""
+        if self.signatures is None:
+            paths = [self.get_cache_path(name, self.texts_key) for name in [MINHASH_NAME, SHINGLES_NAME]]
+            if all(path is not None and path.exists() for path in paths):
+                self.signatures = tuple(np.load(path, mmap_mode="r") for path in paths)
+            else:
+                self.signatures = get_minhash_signatures(self.df_all[TEXT].to_list())
+                if self.cache_dir is not None:
+                    for path, array in zip(paths, self.signatures):
+                        save_array(path, array)
+        return self.signatures
+
+    def get_features(self, distance_type: DistanceType):
+        """The normalized lexical (sparse) or semantic features of the sampled texts."""
+        from sklearn.preprocessing import normalize
+
+        if distance_type not in self.type2features:
+            if distance_type == DistanceType.LEXICAL:
+                features = get_lexical_features(self.df_sample[TEXT].to_list())
+            else:
+                features = np.asarray(self.vectors[self.df_sample.index.to_numpy()], dtype=np.float32)
+            self.type2features[distance_type] = normalize(features)
+        return self.type2features[distance_type]
+
+    def compute_distances(self, distance_type: DistanceType) -> np.ndarray:
+        return get_condensed_cosine_distances(self.get_features(distance_type))
+
+    def get_distances(self, distance_type: DistanceType) -> np.ndarray:
+        """The condensed distances between the sampled texts."""
+        if distance_type == DistanceType.MIXED:
+            lexical_distances = self.get_distances(DistanceType.LEXICAL)
+            semantic_distances = self.get_distances(DistanceType.SEMANTIC)
+            return (lexical_distances.astype(np.float32) + semantic_distances) / 2
 
-    def get_mean_distances(self, df: pd.DataFrame):
-        return [np.mean(row_distances[df.index]) for row_distances in self.distances[df.index]]
+        if distance_type not in self.type2distances:
+            path = self.get_cache_path(distance_type.value.lower(), self.sample_key)
+            if path is not None and path.exists():
+                self.type2distances[distance_type] = np.load(path, mmap_mode="r")
+            else:
+                distances = self.compute_distances(distance_type)
+                if path is not None:
+                    save_array(path, distances)
+                self.type2distances[distance_type] = distances
+        return self.type2distances[distance_type]
 
-    def update_clusters(self, clusters: List[int]):
-        self.df[CLUSTER] = clusters
-        cluster2index = {cluster: i + 1 for i, cluster in enumerate(self.df[CLUSTER].value_counts().keys())}
-        self.df[CLUSTER] = self.df[CLUSTER].apply(lambda cluster: cluster2index[cluster])
+    def get_mean_distances(self, clusters: np.ndarray, distance_type: DistanceType) -> np.ndarray:
+        """The mean distance of each of the sampled texts to the texts of its cluster (itself included)."""
+        if distance_type == DistanceType.MIXED:
+            lexical_mean_distances = self.get_mean_distances(clusters, DistanceType.LEXICAL)
+            return (lexical_mean_distances + self.get_mean_distances(clusters, DistanceType.SEMANTIC)) / 2
+        return get_mean_cosine_distances(self.get_features(distance_type), clusters)
 
-        for cluster, df_cluster in self.df.groupby(CLUSTER):
-            mean_distances = self.get_mean_distances(df_cluster)
-            self.df.loc[df_cluster.index, MEAN_DISTANCE] = mean_distances
+    def has_tree(self, distance_type: DistanceType) -> bool:
+        """Whether the merge tree of a distance type is built, so cutting it is instant."""
+        path = self.get_cache_path(f"{distance_type.value.lower()}_tree", self.sample_key)
+        return distance_type in self.type2tree or (path is not None and path.exists())
 
-        cluster2df = {cluster: df.sort_values(MEAN_DISTANCE) for cluster, df in self.df.groupby(CLUSTER)}
-        self.cluster_dfs = [
-            df for cluster, df in sorted(cluster2df.items(), key=lambda item: len(item[1]), reverse=True)
-        ]
+    def get_tree(self, distance_type: DistanceType) -> np.ndarray:
+        """The complete-linkage merge tree of the sampled texts, built once per distance type."""
+        from scipy.cluster.hierarchy import linkage
+
+        if distance_type not in self.type2tree:
+            path = self.get_cache_path(f"{distance_type.value.lower()}_tree", self.sample_key)
+            if path is not None and path.exists():
+                self.type2tree[distance_type] = np.load(path)
+            else:
+                tree = linkage(self.get_distances(distance_type).astype(np.float64), method="complete")
+                if path is not None:
+                    save_array(path, tree)
+                self.type2tree[distance_type] = tree
+        return self.type2tree[distance_type]
+
+    def update_clusters(self, clusters: np.ndarray, mean_distances: Optional[np.ndarray] = None):
+        """Numbers the clusters by decreasing size, and sorts the texts of each cluster by their mean distance."""
+        _, inverse, counts = np.unique(clusters, return_inverse=True, return_counts=True)
+        cluster_indices = np.empty(len(counts), dtype=int)
+        cluster_indices[np.argsort(-counts, kind="stable")] = np.arange(1, len(counts) + 1)
+        self.df[CLUSTER] = cluster_indices[inverse]
+        # NaN until the texts are clustered by some distance
+        self.df[MEAN_DISTANCE] = np.nan if mean_distances is None else mean_distances
+
+        self.df = self.df.iloc[np.lexsort((self.df[MEAN_DISTANCE].to_numpy(), self.df[CLUSTER].to_numpy()))]
+        self.cluster_offsets = np.concatenate([[0], np.cumsum(np.sort(counts)[::-1])])
+        self.overview = self.get_overview()
+        self.csv, self.duplicates_report_csv = None, None
+
+    def get_overview(self) -> pd.DataFrame:
+        """
+        The size, representative (the text with the smallest mean distance) and cohesion (one minus the mean of the
+        mean distances) of each cluster, from the sorted texts.
+        """
+        starts, sizes = self.cluster_offsets[:-1], np.diff(self.cluster_offsets)
+        mean_distances = np.add.reduceat(self.df[MEAN_DISTANCE].to_numpy(), starts) / sizes
+        return pd.DataFrame(
+            {
+                EXAMPLE: self.df[TEXT].to_numpy()[starts],
+                SIZE: sizes,
+                COHESION: np.round(1 - mean_distances, 2),
+            },
+            index=pd.RangeIndex(1, len(sizes) + 1, name=CLUSTER),
+        )
+
+    def run_hierarchical(self, num_clusters=None, distance_threshold=None) -> np.ndarray:
+        from scipy.cluster.hierarchy import fcluster
+
+        if self.num_sample_examples < 2:
+            return np.zeros(self.num_sample_examples, dtype=int)
+        tree = self.get_tree(self.distance_type)
+        if num_clusters is not None:
+            return cut_tree_by_count(tree, num_clusters)
+        # as AgglomerativeClustering: no merges at or above the threshold
+        return fcluster(tree, t=np.nextafter(distance_threshold, 0), criterion="distance")
 
     def run(
         self,
         num_clusters=None,
         distance_threshold=None,
         distance_type=DistanceType.LEXICAL,
+        engine=HIERARCHICAL,
     ):
+        """
+        With the k-means engine, the texts are clustered by their semantic distances into `num_clusters`, and their
+        mean distance is the distance to their cluster's centroid.
+        With the near-duplicates engine, the texts are grouped by their lexical distances below `distance_threshold`,
+        and their mean distance is the (estimated) distance to the first text of their group.
+        """
         if sum(x is None for x in [num_clusters, distance_threshold]) != 1:
             raise ValueError('You must specify either "num_clusters" or "distance_threshold"')
+        if engine not in CLUSTERING_ENGINES:
+            raise ValueError(f"Unknown clustering engine: {engine} (available: {', '.join(CLUSTERING_ENGINES)})")
+        if engine == K_MEANS and (num_clusters is None or distance_type != DistanceType.SEMANTIC):
+            raise ValueError(f'The "{K_MEANS}" engine requires "num_clusters" and semantic distances')
+        if engine == NEAR_DUPLICATES and (distance_threshold is None or distance_type != DistanceType.LEXICAL):
+            raise ValueError(f'The "{NEAR_DUPLICATES}" engine requires "distance_threshold" and lexical distances')
 
         self.distance_type = distance_type
-        clusters = (
-            AgglomerativeClustering(
-                n_clusters=num_clusters,
-                metric="precomputed",
-                distance_threshold=distance_threshold,
-                linkage="complete",
-            )
-            .fit(self.distances)
-            .labels_
-        )
-        self.update_clusters(clusters)
+        self.engine = engine
+        if engine == K_MEANS:
+            self.df = self.df_all.copy()
+            clusters, mean_distances = fit_k_means(self.vectors, min(num_clusters, len(self.df)))
+        elif engine == NEAR_DUPLICATES:
+            self.df = self.df_all.copy()
+            clusters, mean_distances = find_near_duplicates(*self.get_signatures(), distance_threshold)
+        else:
+            self.df = self.df_sample.copy()
+            clusters = self.run_hierarchical(num_clusters, distance_threshold)
+            mean_distances = self.get_mean_distances(clusters, distance_type)
+        self.update_clusters(clusters, mean_distances)
+
+    def get_csv(self) -> bytes:
+        """The clustered texts as CSV, serialized once per run (the download button needs them on every rerun)."""
+        if self.csv is None:
+            self.csv = self.df.to_csv(index=False).encode()
+        return self.csv
+
+    def get_duplicates_report_csv(self) -> bytes:
+        if self.duplicates_report_csv is None:
+            self.duplicates_report_csv = get_duplicates_report(self.df).to_csv(index=False).encode()
+        return self.duplicates_report_csv
 
     def get_data(self, cluster_index=None):
         if cluster_index is None:
-            return pd.concat(self.cluster_dfs)
-        return self.cluster_dfs[cluster_index - 1][[TEXT]]
+            return self.df
+        return self.df.iloc[self.cluster_offsets[cluster_index - 1] : self.cluster_offsets[cluster_index]][[TEXT]]
@@ -0,0 +1,81 @@
+import re
+import hashlib
+import numpy as np
+from pathlib import Path
+from typing import BinaryIO, List, Tuple
+from salt.logic.segment_store import SegmentStore
+from salt.constants import EMBEDDINGS_CACHE_DIR, EMBEDDINGS_CACHE_MAX_SIZE
+
+KEYS_SUFFIX = ".keys.npy"
+VECTORS_SUFFIX = ".vectors.npy"
+
+
+def get_sentence_hash(sentence: str) -> int:
+    return int.from_bytes(hashlib.blake2b(sentence.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def get_sentences_hashes(sentences: List[str]) -> np.ndarray:
+    return np.fromiter((get_sentence_hash(s) for s in sentences), dtype=np.uint64, count=len(sentences))
+
+
+def get_model_cache_dir(model_name: str, cache_dir: str = EMBEDDINGS_CACHE_DIR) -> Path:
+    return Path(cache_dir).joinpath(re.sub(r"[^\w.-]", "_", model_name))
+
+
+class EmbeddingCache(SegmentStore):
+    """
+    On-disk sentence-embedding cache of a single model, keyed by sentence hash.
+    Each segment is a float32 `.vectors.npy` matrix + its `.keys.npy` hashes, written last.
+    """
+
+    SUFFIXES = [VECTORS_SUFFIX, KEYS_SUFFIX]
+
+    def __init__(
+        self, model_name: str, cache_dir: str = EMBEDDINGS_CACHE_DIR, max_size: int = EMBEDDINGS_CACHE_MAX_SIZE
+    ):
+        super().__init__(get_model_cache_dir(model_name, cache_dir), max_size)
+
+    def write_file(self, f: BinaryIO, suffix: str, data: Tuple[np.ndarray, np.ndarray]) -> None:
+        hashes, vectors = data
+        np.save(f, hashes if suffix == KEYS_SUFFIX else vectors)
+
+    def read_segment(self, segment: str) -> Tuple[np.ndarray, np.ndarray]:
+        return np.load(self.get_segment_path(segment, KEYS_SUFFIX)), np.load(
+            self.get_segment_path(segment, VECTORS_SUFFIX)
+        )
+
+    def merge(self, datas: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+        hashes, unique_indices = np.unique(np.concatenate([hashes for hashes, _ in datas]), return_index=True)
+        return hashes, np.concatenate([vectors for _, vectors in datas])[unique_indices]
+
+    def get(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns a mask of the cached hashes and the vectors of the cached ones (in the order of `hashes`)."""
+        found = np.zeros(len(hashes), dtype=bool)
+        vectors = None
+        for segment in self.get_segments():
+            try:
+                keys = np.load(self.get_segment_path(segment, KEYS_SUFFIX))
+                segment_vectors = np.load(self.get_segment_path(segment, VECTORS_SUFFIX), mmap_mode="r")
+            except (FileNotFoundError, ValueError):  # evicted or being written by another process
+                continue
+
+            order = np.argsort(keys)
+            positions = np.searchsorted(keys, hashes, sorter=order).clip(max=len(keys) - 1)
+            rows = order[positions]
+            is_hit = (keys[rows] == hashes) & ~found
+            if not is_hit.any():
+                continue
+
+            if vectors is None:
+                vectors = np.zeros((len(hashes), segment_vectors.shape[1]), dtype=np.float32)
+            vectors[is_hit] = segment_vectors[rows[is_hit]]
+            found |= is_hit
+            self.touch(segment)
+
+        return found, vectors[found] if vectors is not None else np.zeros((0, 0), dtype=np.float32)
+
+    def put(self, hashes: np.ndarray, vectors: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        hashes, unique_indices = np.unique(hashes, return_index=True)
+        self.add((hashes, np.asarray(vectors, dtype=np.float32)[unique_indices]))
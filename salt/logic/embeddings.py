@@ -1,29 +1,95 @@
-import nltk
+import time
 import pickle
+import logging
 import numpy as np
 import pandas as pd
 import streamlit as st
 from stqdm import stqdm
 from pathlib import Path
 from itertools import chain
-from typing import Dict, List
+from dataclasses import dataclass
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from salt.constants import NA
-from sentence_transformers import SentenceTransformer
-
-nltk.download('punkt')
+from salt.logic.encoding_pool import encode_batches, create_encoding_pool
+from salt.logic.segmentation import segment_texts, create_segmentation_pool, DEFAULT_SEGMENTER
+from salt.logic.encoders import Encoder, create_encoder, MODEL_NAME, DEFAULT_ENCODER_BACKEND, TORCH
+from salt.logic.embedding_cache import EmbeddingCache, get_sentences_hashes
 
 TEXTS_KEY = "texts"
 VECTORS_KEY = "vectors"
 LABELS_KEY = "labels"
 METADATA_KEY = "metadata"
 MODEL_NAME_KEY = "model_name"
-MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODER_BACKEND_KEY = "encoder_backend"
+SEGMENTER_KEY = "segmenter"
 BATCH_SIZE = 32
+MAX_BATCH_TOKENS = 4096
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EncodingParams:
+    batch_size: int = BATCH_SIZE  # used only when batching by input order (max_batch_tokens=None)
+    max_batch_tokens: Optional[int] = MAX_BATCH_TOKENS  # batch by length, up to this number of padded tokens
+    num_workers: int = 1  # segmentation and encoding processes (0: one per CPU core)
+    model_name: str = MODEL_NAME
+    backend: str = DEFAULT_ENCODER_BACKEND
+    segmenter: str = DEFAULT_SEGMENTER
+
+
+@dataclass
+class EmbeddingStats:
+    hits: int = 0
+    misses: int = 0
+    segmentation_seconds: float = 0.0
+    encoding_seconds: float = 0.0
+
+
+@dataclass
+class EncodingPools:
+    segmentation: Optional[ProcessPoolExecutor] = None
+    encoding: Optional[ProcessPoolExecutor] = None
+
+
+@contextmanager
+def open_encoding_pools(params: EncodingParams) -> Iterator[EncodingPools]:
+    """
+    The segmentation and encoding pools of `params.num_workers` processes, to share between many `embed_texts` calls
+    (e.g. the chunks of an ingestion), so each call doesn't start new processes that load the model again.
+    """
+    if params.num_workers == 1:
+        yield EncodingPools()
+        return
+
+    with create_segmentation_pool(params.num_workers) as segmentation_pool, create_encoding_pool(
+        params.model_name, params.backend, params.num_workers
+    ) as encoding_pool:
+        yield EncodingPools(segmentation_pool, encoding_pool)
+
+
+def get_encoding_params(metadata: Dict, **kwargs) -> EncodingParams:
+    return EncodingParams(
+        model_name=metadata.get(MODEL_NAME_KEY, MODEL_NAME),
+        backend=metadata.get(ENCODER_BACKEND_KEY, DEFAULT_ENCODER_BACKEND),  # backward-compatibility
+        segmenter=metadata.get(SEGMENTER_KEY, DEFAULT_SEGMENTER),
+        **kwargs,
+    )
+
+
+def get_metadata(params: EncodingParams) -> Dict:
+    return {MODEL_NAME_KEY: params.model_name, ENCODER_BACKEND_KEY: params.backend, SEGMENTER_KEY: params.segmenter}
+
+
+def get_cache_name(params: EncodingParams) -> str:
+    return params.model_name if params.backend == TORCH else f"{params.model_name}@{params.backend}"
 
 
 @st.cache_resource
-def get_model(model_name: str) -> SentenceTransformer:
-    return SentenceTransformer(model_name)
+def get_encoder(model_name: str, backend: str) -> Encoder:
+    return create_encoder(model_name, backend)
 
 
 def load_embeddings(path: str) -> Dict:
@@ -41,42 +107,134 @@ def get_relevant_texts(texts: list[str]) -> list[str]:
     return list(set([text for text in texts if len(text.strip()) > 0]))
 
 
-def embed_texts(texts: List[str]) -> List[List[float]]:
-    model = get_model(MODEL_NAME)
-    texts_sentences = [nltk.sent_tokenize(text) for text in texts]
+def get_batches(encoder: Encoder, sentences: List[str], params: EncodingParams) -> List[np.ndarray]:
+    if params.max_batch_tokens is None:
+        return [
+            np.arange(start, min(start + params.batch_size, len(sentences)))
+            for start in range(0, len(sentences), params.batch_size)
+        ]
+
+    # longest first, so each batch is padded to the length of its first sentence
+    lengths = encoder.get_tokens_lengths(sentences)
+    order = np.argsort(-lengths, kind="stable")
+    batches = []
+    start = 0
+    while start < len(order):
+        batch_size = max(1, params.max_batch_tokens // lengths[order[start]])
+        batches.append(order[start : start + batch_size])
+        start += batch_size
+    return batches
+
+
+def encode_batches_serially(
+    encoder: Encoder,
+    sentences: List[str],
+    batches: List[np.ndarray],
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    for batch in batches:
+        yield batch, encoder.encode([sentences[i] for i in batch], batch_size=len(batch))
+
+
+def encode_sentences(
+    sentences: List[str],
+    params: Optional[EncodingParams] = None,
+    pools: Optional[EncodingPools] = None,
+) -> np.ndarray:
+    params = params or EncodingParams()
+    pools = pools or EncodingPools()
+    encoder = get_encoder(params.model_name, params.backend)
+    batches = get_batches(encoder, sentences, params)
+    if len(batches) <= 1:
+        return encoder.encode(sentences, batch_size=max(len(sentences), 1))
+
+    if params.num_workers != 1:
+        encoded_batches = encode_batches(
+            params.model_name, params.backend, sentences, batches, params.num_workers, pools.encoding
+        )
+    else:
+        encoded_batches = encode_batches_serially(encoder, sentences, batches)
+
+    vectors = None
+    with stqdm(total=len(sentences), desc="vectorizing texts") as progress:
+        for batch, batch_vectors in encoded_batches:
+            if vectors is None:
+                vectors = np.zeros((len(sentences), batch_vectors.shape[1]), dtype=batch_vectors.dtype)
+            vectors[batch] = batch_vectors
+            progress.update(len(batch))
+    return vectors
+
+
+def embed_sentences(
+    sentences: List[str],
+    params: Optional[EncodingParams] = None,
+    stats: Optional[EmbeddingStats] = None,
+    pools: Optional[EncodingPools] = None,
+) -> np.ndarray:
+    params = params or EncodingParams()
+    hashes = get_sentences_hashes(sentences)
+    cache = EmbeddingCache(get_cache_name(params))
+    is_cached, cached_vectors = cache.get(hashes)
+
+    missing_hashes, missing_indices, missing_inverse = np.unique(
+        hashes[~is_cached], return_index=True, return_inverse=True
+    )
+    missing_sentences = [sentences[i] for i in np.flatnonzero(~is_cached)[missing_indices]]
+    missing_vectors = encode_sentences(missing_sentences, params, pools) if missing_sentences else cached_vectors[:0]
+    cache.put(missing_hashes, missing_vectors)
+
+    dim = cached_vectors.shape[1] if len(cached_vectors) else missing_vectors.shape[1]
+    sentences_vectors = np.zeros((len(sentences), dim), dtype=np.float32)
+    if len(cached_vectors):
+        sentences_vectors[is_cached] = cached_vectors
+    sentences_vectors[~is_cached] = missing_vectors[missing_inverse]
+
+    num_hits = int(is_cached.sum())
+    logger.info(f"Embedding cache: {num_hits} hits, {len(sentences) - num_hits} misses")
+    if stats is not None:
+        stats.hits += num_hits
+        stats.misses += len(sentences) - num_hits
+    return sentences_vectors
+
+
+def embed_texts(
+    texts: List[str],
+    params: Optional[EncodingParams] = None,
+    stats: Optional[EmbeddingStats] = None,
+    pools: Optional[EncodingPools] = None,
+) -> np.ndarray:
+    params = params or EncodingParams()
+    pools = pools or EncodingPools()
+    start = time.perf_counter()
+    texts_sentences = segment_texts(texts, params.segmenter, params.num_workers, pools.segmentation)
+    segmentation_seconds = time.perf_counter() - start
+
     texts_lengths = [len(sentences) for sentences in texts_sentences]
     all_sentences = list(chain.from_iterable(texts_sentences))
-    if len(all_sentences) <= BATCH_SIZE:
-        sentences_vectors = model.encode(all_sentences).tolist()
-    else:
-        sentences_chunks = np.array_split(all_sentences, len(all_sentences) // BATCH_SIZE)
-        sentences_vectors = list(
-            chain.from_iterable(
-                [
-                    model.encode(sentences).tolist()
-                    for sentences in stqdm(
-                        sentences_chunks,
-                        desc="vectorizing texts",
-                        unit_scale=BATCH_SIZE,
-                    )
-                ]
-            )
-        )
-    texts_vectors = []
-    start_sentence_index = 0
-    while start_sentence_index < len(sentences_vectors):
-        end_sentence_index = start_sentence_index + texts_lengths[len(texts_vectors)]
-        vector = np.mean(sentences_vectors[start_sentence_index:end_sentence_index], axis=0)
-        texts_vectors.append(vector.tolist())
-        start_sentence_index = end_sentence_index
+    start = time.perf_counter()
+    sentences_vectors = embed_sentences(all_sentences, params, stats, pools)
+    encoding_seconds = time.perf_counter() - start
 
-    return texts_vectors
+    logger.info(
+        f"Segmented {len(texts)} texts in {segmentation_seconds:.2f}s, "
+        f"embedded {len(all_sentences)} sentences in {encoding_seconds:.2f}s"
+    )
+    if stats is not None:
+        stats.segmentation_seconds += segmentation_seconds
+        stats.encoding_seconds += encoding_seconds
 
+    ends = np.cumsum(texts_lengths)
+    return np.stack([sentences_vectors[end - length : end].mean(axis=0) for end, length in zip(ends, texts_lengths)])
 
-def create_embeddings(df: pd.DataFrame, text_column: str, label_column: str = None) -> Dict:
+
+def create_embeddings(
+    df: pd.DataFrame,
+    text_column: str,
+    label_column: str = None,
+    params: Optional[EncodingParams] = None,
+) -> Dict:
     data = df.fillna("").astype("str").to_dict("records")
     texts = get_relevant_texts([x[text_column] for x in data])
-    vectors = embed_texts(texts)
+    vectors = embed_texts(texts, params)
 
     if label_column:
         text2label = {x[text_column]: x[label_column] if len(x[label_column].strip()) > 0 else NA for x in data}
@@ -84,20 +242,20 @@ def create_embeddings(df: pd.DataFrame, text_column: str, label_column: str = No
     else:
         labels = [NA] * len(texts)
 
-    return get_embeddings_dict(texts, vectors, labels, MODEL_NAME)
+    return get_embeddings_dict(texts, vectors, labels, params or EncodingParams())
 
 
 def get_embeddings_dict(
     texts: List[str],
-    vectors: List[List[float]],
+    vectors: np.ndarray,
     labels: List[str],
-    model_name: str = MODEL_NAME,
+    params: Optional[EncodingParams] = None,
 ) -> Dict:
     return {
         TEXTS_KEY: texts,
         VECTORS_KEY: vectors,
         LABELS_KEY: labels,
-        METADATA_KEY: {MODEL_NAME_KEY: model_name},
+        METADATA_KEY: get_metadata(params or EncodingParams()),
     }
 
 
@@ -0,0 +1,109 @@
+import time
+import argparse
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Type
+from salt.utils import read_csv_or_jsonl
+
+TORCH = "torch"
+TORCH_INT8 = "torch-int8"
+DEFAULT_ENCODER_BACKEND = TORCH
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+COMPARISON_BATCH_SIZE = 32
+
+ENCODER_BACKENDS: Dict[str, Type["Encoder"]] = {}
+
+
+def register_encoder(name: str) -> Callable:
+    def register(cls: Type["Encoder"]) -> Type["Encoder"]:
+        ENCODER_BACKENDS[name] = cls
+        return cls
+
+    return register
+
+
+class Encoder(ABC):
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @abstractmethod
+    def encode(self, sentences: List[str], batch_size: int) -> np.ndarray:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_tokens_lengths(self, sentences: List[str]) -> np.ndarray:
+        raise NotImplementedError()
+
+
+@register_encoder(TORCH)
+class TorchEncoder(Encoder):
+    device = None  # let sentence-transformers pick (GPU if available)
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device=self.device)
+
+    def encode(self, sentences: List[str], batch_size: int) -> np.ndarray:
+        return self.model.encode(sentences, batch_size=batch_size)
+
+    def get_tokens_lengths(self, sentences: List[str]) -> np.ndarray:
+        input_ids = self.model.tokenizer(sentences, truncation=True, max_length=self.model.max_seq_length)["input_ids"]
+        return np.array([len(ids) for ids in input_ids])
+
+
+@register_encoder(TORCH_INT8)
+class QuantizedTorchEncoder(TorchEncoder):
+    device = "cpu"  # dynamic quantization kernels are CPU-only
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        import torch
+
+        self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def create_encoder(model_name: str, backend: str = DEFAULT_ENCODER_BACKEND) -> Encoder:
+    if backend not in ENCODER_BACKENDS:
+        raise ValueError(f"Unknown encoder backend: {backend} (available: {', '.join(ENCODER_BACKENDS)})")
+    return ENCODER_BACKENDS[backend](model_name)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def compare_backends(model_name: str, backend: str, reference_backend: str, sentences: List[str]) -> Dict:
+    backend2vectors = {}
+    results = {"num_sentences": len(sentences)}
+    for name in [reference_backend, backend]:
+        encoder = create_encoder(model_name, name)
+        start = time.perf_counter()
+        backend2vectors[name] = encoder.encode(sentences, COMPARISON_BATCH_SIZE)
+        results[f"{name} sentences/sec"] = len(sentences) / (time.perf_counter() - start)
+
+    cosines = (normalize(backend2vectors[reference_backend]) * normalize(backend2vectors[backend])).sum(axis=1)
+    results["mean cosine agreement"] = float(cosines.mean())
+    results["min cosine agreement"] = float(cosines.min())
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare an encoder backend against a reference backend")
+    parser.add_argument("path", help="CSV or JSONL file with the texts to encode")
+    parser.add_argument("--column", required=True, help="text column")
+    parser.add_argument("--backend", choices=list(ENCODER_BACKENDS), default=TORCH_INT8)
+    parser.add_argument("--reference-backend", choices=list(ENCODER_BACKENDS), default=TORCH)
+    parser.add_argument("--model-name", default=MODEL_NAME)
+    parser.add_argument("--num-sentences", type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = read_csv_or_jsonl(args.path)[args.column].dropna().astype("str")
+    sentences = texts[texts.str.strip().str.len() > 0].head(args.num_sentences).to_list()
+    for key, value in compare_backends(args.model_name, args.backend, args.reference_backend, sentences).items():
+        print(f"{key}: {value:.4f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
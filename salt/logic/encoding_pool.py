@@ -0,0 +1,60 @@
+import os
+import numpy as np
+from multiprocessing import get_context
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Workers get the same batches as the serial path (so the same padding), but run single-threaded torch kernels,
+# which may sum in a different order: their vectors may differ from the serial ones in the last float32 digits.
+_worker_encoder = None
+
+
+def get_num_workers(num_workers: int) -> int:
+    return num_workers if num_workers > 0 else os.cpu_count() or 1
+
+
+def init_worker(model_name: str, backend: str, num_threads: int) -> None:
+    global _worker_encoder
+    import torch
+    from salt.logic.encoders import create_encoder
+
+    torch.set_num_threads(num_threads)
+    _worker_encoder = create_encoder(model_name, backend)
+
+
+def encode_batch(sentences: List[str]) -> np.ndarray:
+    return _worker_encoder.encode(sentences, batch_size=len(sentences))
+
+
+def create_encoding_pool(model_name: str, backend: str, num_workers: int) -> ProcessPoolExecutor:
+    """A pool of encoding processes, each loading the model once (when the first batches are submitted)."""
+    num_workers = get_num_workers(num_workers)
+    num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    return ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=get_context("spawn"),  # torch is not fork-safe
+        initializer=init_worker,
+        initargs=(model_name, backend, num_threads),
+    )
+
+
+def encode_batches(
+    model_name: str,
+    backend: str,
+    sentences: List[str],
+    batches: List[np.ndarray],
+    num_workers: int,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Yields (batch indices, batch vectors) pairs, in order of completion, from a pool of encoding processes:
+    `executor` if given (see `create_encoding_pool`), or a pool of its own otherwise.
+    """
+    if executor is None:
+        with create_encoding_pool(model_name, backend, num_workers) as executor:
+            yield from encode_batches(model_name, backend, sentences, batches, num_workers, executor)
+        return
+
+    future2batch = {executor.submit(encode_batch, [sentences[i] for i in batch]): batch for batch in batches}
+    for future in as_completed(future2batch):
+        yield future2batch[future], future.result()
@@ -1,10 +1,11 @@
+import numpy as np
 import pandas as pd
 from dataclasses import dataclass
 from salt.logic.clusters import Clusters
-from salt.logic.embeddings import embed_texts
-from sklearn.metrics.pairwise import cosine_similarity
-from salt.logic.utils import get_prob_col, get_labels_from_str
-from salt.constants import TEXT, VECTOR, LABEL, PRED, CLUSTER, DATE
+from salt.logic.embeddings import embed_texts, EncodingParams
+from salt.logic.label_store import LabelStore
+from salt.logic.utils import get_prob_col
+from salt.constants import TEXT, LABEL, PRED, CLUSTER, DATE
 
 
 @dataclass
@@ -18,28 +19,39 @@ class FilterParams:
 
 
 class Filter:
-    def __init__(self, clusters: Clusters):
+    def __init__(
+        self, clusters: Clusters, vectors: np.ndarray, encoding_params: EncodingParams, label_store: LabelStore
+    ):
         self.clusters = clusters
+        self.vectors = vectors
+        self.encoding_params = encoding_params
+        self.label_store = label_store
 
-    @staticmethod
-    def sort_by_similarity(df: pd.DataFrame, query: str) -> pd.DataFrame:
-        vector = embed_texts([query])
-        df["similarity"] = cosine_similarity(vector, df[VECTOR].to_list()).flatten()
+    def sort_by_similarity(self, df: pd.DataFrame, query: str) -> pd.DataFrame:
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        vector = embed_texts([query], self.encoding_params)
+        df["similarity"] = cosine_similarity(vector, self.vectors[df.index]).flatten()
         return df.sort_values(by="similarity", ascending=False).drop(columns={"similarity"})
 
     def get_data(self, df: pd.DataFrame, params: FilterParams) -> pd.DataFrame:
         if params.label:
-            df = df[df[LABEL].apply(lambda s: params.label in get_labels_from_str(s))]
+            df = df[self.label_store.get_gold_mask(params.label)[df.index]]
         if params.cluster is not None:
             df_cluster = self.clusters.get_data(params.cluster)
             df = df[df[TEXT].isin(df_cluster[TEXT])]
         if params.pred:
-            df = df[df[PRED].apply(lambda s: params.pred in get_labels_from_str(s))].sort_values(
-                get_prob_col(params.pred), ascending=False
-            )
+            df = df[self.label_store.get_pred_mask(params.pred)[df.index]]
+            order = np.argsort(-self.label_store.get_probs(params.pred, df.index), kind="stable")
+            df = df.iloc[order]
         if params.query:
             if params.use_semantics:
                 df = self.sort_by_similarity(df, params.query)
             else:
                 df = df[df[TEXT].str.contains(params.query, case=False, regex=params.use_regex)]
+        df = df.assign(
+            **{LABEL: self.label_store.get_gold_strs(df.index), PRED: self.label_store.get_pred_strs(df.index)}
+        )
+        if params.pred:
+            df[get_prob_col(params.pred)] = self.label_store.get_probs(params.pred, df.index)
         return df[[TEXT, LABEL, PRED, CLUSTER, DATE] + ([get_prob_col(params.pred)] if params.pred else [])]
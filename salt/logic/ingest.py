@@ -0,0 +1,223 @@
+import os
+import json
+import shutil
+import hashlib
+import argparse
+import numpy as np
+import pandas as pd
+from stqdm import stqdm
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set
+from salt.utils import read_csv_or_jsonl_chunks
+from salt.logic.embedding_cache import get_sentences_hashes
+from salt.logic.encoders import ENCODER_BACKENDS, DEFAULT_ENCODER_BACKEND
+from salt.logic.segmentation import SEGMENTERS, DEFAULT_SEGMENTER
+from salt.logic.embeddings import EncodingParams, EmbeddingStats, embed_texts, get_metadata, open_encoding_pools
+from salt.logic.vector_store import VECTORS_DTYPE, get_store_path, dump_json, dump_records, dump_metadata
+from salt.constants import (
+    TEXT,
+    LABEL,
+    NA,
+    PROJECTS_DIR,
+    VECTORS_FILE_NAME,
+    CHECKPOINT_FILE_NAME,
+    PARTS_DIR_NAME,
+)
+
+CHUNK_SIZE = 10_000
+SOURCE_KEY = "source"
+NUM_CHUNKS_KEY = "num_chunks"
+NUM_ROWS_KEY = "num_rows"
+DIM_KEY = "dim"
+
+
+def get_source_id(*fields) -> str:
+    return hashlib.blake2b(json.dumps([str(field) for field in fields]).encode()).hexdigest()
+
+
+def get_file_source_id(path: str, text_column: str, label_column: Optional[str], chunk_size: int) -> str:
+    stat = os.stat(path)
+    return get_source_id(os.path.abspath(path), stat.st_size, stat.st_mtime_ns, text_column, label_column, chunk_size)
+
+
+def get_dataframe_source_id(df: pd.DataFrame, text_column: str, label_column: Optional[str], chunk_size: int) -> str:
+    columns = [column for column in [text_column, label_column] if column]
+    rows_hashes = pd.util.hash_pandas_object(df[columns].fillna("").astype("str"), index=False).to_numpy()
+    content_hash = hashlib.blake2b(rows_hashes.tobytes()).hexdigest()
+    return get_source_id(content_hash, text_column, label_column, chunk_size)
+
+
+def get_checkpoint_path(dir_path: str) -> Path:
+    return get_store_path(dir_path, CHECKPOINT_FILE_NAME)
+
+
+def get_partial_vectors_path(dir_path: str) -> Path:
+    return get_store_path(dir_path, f"{VECTORS_FILE_NAME}.partial")
+
+
+def get_part_path(dir_path: str, chunk_index: int) -> Path:
+    return get_store_path(dir_path, PARTS_DIR_NAME).joinpath(f"records_{chunk_index:06}.parquet")
+
+
+def is_incomplete(dir_path: str) -> bool:
+    return get_checkpoint_path(dir_path).exists()
+
+
+def load_checkpoint(dir_path: str, source_id: str) -> Dict:
+    checkpoint_path = get_checkpoint_path(dir_path)
+    if checkpoint_path.exists():
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint[SOURCE_KEY] == source_id:
+            return checkpoint
+
+    shutil.rmtree(get_store_path(dir_path, PARTS_DIR_NAME), ignore_errors=True)
+    get_partial_vectors_path(dir_path).unlink(missing_ok=True)
+    return {SOURCE_KEY: source_id, NUM_CHUNKS_KEY: 0, NUM_ROWS_KEY: 0, DIM_KEY: 0}
+
+
+def restore_checkpoint_state(dir_path: str, checkpoint: Dict) -> Set[int]:
+    """Drops any work done after the last checkpoint, and returns the hashes of the texts ingested until then."""
+    vectors_path, partial_vectors_path = get_store_path(dir_path, VECTORS_FILE_NAME), get_partial_vectors_path(dir_path)
+    if checkpoint[NUM_CHUNKS_KEY] and not partial_vectors_path.exists() and vectors_path.exists():
+        os.replace(vectors_path, partial_vectors_path)  # interrupted while finalizing
+    with open(partial_vectors_path, "ab") as f:
+        f.truncate(checkpoint[NUM_ROWS_KEY] * checkpoint[DIM_KEY] * np.dtype(VECTORS_DTYPE).itemsize)
+
+    seen_hashes = set()
+    for part_path in sorted(get_store_path(dir_path, PARTS_DIR_NAME).glob("*.parquet")):
+        if int(part_path.stem.split("_")[-1]) >= checkpoint[NUM_CHUNKS_KEY]:
+            part_path.unlink()
+        else:
+            seen_hashes.update(get_sentences_hashes(pd.read_parquet(part_path)[TEXT].to_list()).tolist())
+    return seen_hashes
+
+
+def get_chunk_records(
+    chunk: pd.DataFrame,
+    text_column: str,
+    label_column: Optional[str],
+    seen_hashes: Set[int],
+) -> pd.DataFrame:
+    chunk = chunk.fillna("").astype("str")
+    records = pd.DataFrame({TEXT: chunk[text_column], LABEL: chunk[label_column] if label_column else NA})
+    records.loc[records[LABEL].str.strip().str.len() == 0, LABEL] = NA
+    records = records[records[TEXT].str.strip().str.len() > 0]
+
+    hashes = get_sentences_hashes(records[TEXT].to_list())
+    is_seen = np.array([h in seen_hashes for h in hashes.tolist()], dtype=bool)
+    is_new = ~pd.Series(hashes).duplicated().to_numpy() & ~is_seen
+    seen_hashes.update(hashes[is_new].tolist())
+    return records[is_new].reset_index(drop=True)
+
+
+def finalize(dir_path: str, checkpoint: Dict, params: EncodingParams) -> None:
+    parts_paths = sorted(get_store_path(dir_path, PARTS_DIR_NAME).glob("*.parquet"))
+    records = (
+        pd.concat([pd.read_parquet(path) for path in parts_paths])
+        if parts_paths
+        else pd.DataFrame({TEXT: [], LABEL: []})
+    )
+    dump_records(records, dir_path)
+    os.replace(get_partial_vectors_path(dir_path), get_store_path(dir_path, VECTORS_FILE_NAME))
+    dump_metadata(get_metadata(params), dir_path, VECTORS_DTYPE, (checkpoint[NUM_ROWS_KEY], checkpoint[DIM_KEY]))
+    get_checkpoint_path(dir_path).unlink()  # the store is complete: before removing the parts a resume would need
+    shutil.rmtree(get_store_path(dir_path, PARTS_DIR_NAME))
+
+
+def ingest(
+    chunks: Iterator[pd.DataFrame],
+    text_column: str,
+    label_column: Optional[str],
+    dir_path: str,
+    source_id: str,
+    params: Optional[EncodingParams] = None,
+    num_chunks: Optional[int] = None,
+    stats: Optional[EmbeddingStats] = None,
+) -> None:
+    """
+    Embeds the texts chunk by chunk into the vector store at `dir_path`, skipping empty and duplicate texts.
+    Vectors and records are appended to disk with a checkpoint after each chunk, so an interrupted ingestion
+    of the same source resumes from its last checkpoint.
+    """
+    params = params or EncodingParams()
+    Path(dir_path).mkdir(parents=True, exist_ok=True)
+    source_id = get_source_id(source_id, params.model_name, params.backend, params.segmenter)
+    checkpoint = load_checkpoint(dir_path, source_id)
+    get_store_path(dir_path, PARTS_DIR_NAME).mkdir(exist_ok=True)
+    seen_hashes = restore_checkpoint_state(dir_path, checkpoint)
+
+    with open_encoding_pools(params) as pools:
+        for chunk_index, chunk in enumerate(stqdm(chunks, total=num_chunks, desc="ingesting chunks")):
+            if chunk_index < checkpoint[NUM_CHUNKS_KEY]:
+                continue
+
+            records = get_chunk_records(chunk, text_column, label_column, seen_hashes)
+            if len(records):
+                vectors = embed_texts(records[TEXT].to_list(), params, stats, pools).astype(VECTORS_DTYPE)
+                with open(get_partial_vectors_path(dir_path), "ab") as f:
+                    f.write(vectors.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                records.to_parquet(get_part_path(dir_path, chunk_index), index=False)
+                checkpoint[DIM_KEY] = vectors.shape[1]
+
+            checkpoint[NUM_CHUNKS_KEY] = chunk_index + 1
+            checkpoint[NUM_ROWS_KEY] += len(records)
+            dump_json(checkpoint, get_checkpoint_path(dir_path))
+
+    finalize(dir_path, checkpoint, params)
+
+
+def ingest_dataframe(
+    df: pd.DataFrame,
+    text_column: str,
+    label_column: Optional[str],
+    dir_path: str,
+    params: Optional[EncodingParams] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> None:
+    chunks = (df.iloc[start : start + chunk_size] for start in range(0, len(df), chunk_size))
+    source_id = get_dataframe_source_id(df, text_column, label_column, chunk_size)
+    num_chunks = -(-len(df) // chunk_size)
+    ingest(chunks, text_column, label_column, dir_path, source_id, params, num_chunks)
+
+
+def ingest_file(
+    path: str,
+    text_column: str,
+    label_column: Optional[str],
+    dir_path: str,
+    params: Optional[EncodingParams] = None,
+    chunk_size: int = CHUNK_SIZE,
+    stats: Optional[EmbeddingStats] = None,
+) -> None:
+    columns = [column for column in [text_column, label_column] if column]
+    chunks = read_csv_or_jsonl_chunks(path, columns, chunk_size)
+    source_id = get_file_source_id(path, text_column, label_column, chunk_size)
+    ingest(chunks, text_column, label_column, dir_path, source_id, params, stats=stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create a project from a CSV/JSONL file, chunk by chunk")
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--project", required=True, help="project name (re-run to resume an interrupted creation)")
+    parser.add_argument("--text-column", required=True)
+    parser.add_argument("--label-column", default=None)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--num-workers", type=int, default=1, help="processes per stage (0: one per CPU core)")
+    parser.add_argument("--backend", choices=list(ENCODER_BACKENDS), default=DEFAULT_ENCODER_BACKEND)
+    parser.add_argument("--segmenter", choices=list(SEGMENTERS), default=DEFAULT_SEGMENTER)
+    args = parser.parse_args()
+
+    params = EncodingParams(num_workers=args.num_workers, backend=args.backend, segmenter=args.segmenter)
+    dir_path = os.path.join(PROJECTS_DIR, args.project)
+    stats = EmbeddingStats()
+    ingest_file(args.path, args.text_column, args.label_column, dir_path, params, args.chunk_size, stats)
+    print(f"Project {args.project} created at {dir_path}")
+    print(f"segmentation: {stats.segmentation_seconds:.1f}s, encoding: {stats.encoding_seconds:.1f}s")
+    print(f"embedding cache: {stats.hits} hits, {stats.misses} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+from salt.constants import NA, SKIP
+from salt.logic.utils import get_labels_from_str, get_strs_from_labels_matrix
+
+UNLABELED = 0
+LABELED = 1
+SKIPPED = 2
+
+
+class LabelStats:
+    """Counts of the gold labels and predictions, updated with each change instead of recounted over all the rows."""
+
+    def __init__(self, num_rows: int):
+        self.status_counts = np.array([num_rows, 0, 0], dtype=np.int64)  # by status: unlabeled, labeled, skipped
+        self.class_counts = np.zeros(0, dtype=np.int64)  # labeled rows per class
+        self.num_multilabel = 0  # labeled rows with more than one class
+        self.pred_counts = np.zeros(0, dtype=np.int64)  # predicted rows per class
+        self.num_unpredicted = num_rows
+
+    def add_classes(self, num_classes: int) -> None:
+        self.class_counts = np.pad(self.class_counts, (0, num_classes))
+        self.pred_counts = np.pad(self.pred_counts, (0, num_classes))
+
+    def update(self, status: np.ndarray, labels_matrix: np.ndarray, sign: int) -> None:
+        """Adds (sign=1) or removes (sign=-1) the counts of some rows."""
+        self.status_counts += sign * np.bincount(status, minlength=3)
+        self.class_counts += sign * labels_matrix.sum(axis=0)
+        self.num_multilabel += sign * int(np.count_nonzero(labels_matrix.sum(axis=1) > 1))
+
+    def set_predictions(self, preds: np.ndarray) -> None:
+        self.pred_counts = preds.sum(axis=0)
+        self.num_unpredicted = int(np.count_nonzero(~preds.any(axis=1)))
+
+    @property
+    def num_labeled(self) -> int:
+        return int(self.status_counts[LABELED])
+
+    @property
+    def num_annotated(self) -> int:
+        return int(self.status_counts[LABELED] + self.status_counts[SKIPPED])
+
+
+@dataclass
+class LabelsSnapshot:
+    status: np.ndarray
+    train_indices: np.ndarray
+    train_matrix: np.ndarray  # (train rows, classes)
+    classes: List[str]  # sorted
+
+
+class LabelStore:
+    """
+    The gold labels and the predictions of a project, as boolean (rows, classes) matrices over a class vocabulary.
+    Gold rows also have a status (unlabeled / labeled / skipped), and only labeled rows have positive classes.
+    Labels strings (comma-separated classes, NA or Skip) are parsed once on input and only joined back on export.
+    """
+
+    def __init__(self, num_rows: int):
+        self.classes: List[str] = []
+        self.class2index: Dict[str, int] = {}
+        self.status = np.full(num_rows, UNLABELED, dtype=np.int8)
+        self.gold = np.zeros((num_rows, 0), dtype=bool)
+        self.preds = np.zeros((num_rows, 0), dtype=bool)
+        self.probs = np.zeros((num_rows, 0), dtype=np.float32)
+        self.pred_classes: List[str] = []  # the classes of the last predictions
+        self.stats = LabelStats(num_rows)
+
+    @staticmethod
+    def from_strs(labels_strs: Sequence[str]) -> "LabelStore":
+        store = LabelStore(len(labels_strs))
+        store.set_gold(np.arange(len(labels_strs)), labels_strs)
+        return store
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.status)
+
+    def add_classes(self, classes: Sequence[str]) -> None:
+        new_classes = [cls for cls in dict.fromkeys(classes) if cls not in self.class2index]
+        if not new_classes:
+            return
+        for cls in new_classes:
+            self.class2index[cls] = len(self.classes)
+            self.classes.append(cls)
+        padding = ((0, 0), (0, len(new_classes)))
+        self.gold = np.pad(self.gold, padding)
+        self.preds = np.pad(self.preds, padding)
+        self.probs = np.pad(self.probs, padding, constant_values=np.nan)
+        self.stats.add_classes(len(new_classes))
+
+    def get_classes_indices(self, classes: Sequence[str]) -> np.ndarray:
+        self.add_classes(classes)
+        return np.array([self.class2index[cls] for cls in classes], dtype=np.int64)
+
+    def parse_strs(self, labels_strs: Sequence[str]) -> np.ndarray:
+        """The (rows, vocabulary) matrix of labels strings, parsing each distinct string once."""
+        codes, uniques = pd.factorize(pd.Series(labels_strs, dtype="object"))
+        uniques_classes = [[] if s in [NA, SKIP] else get_labels_from_str(s) for s in uniques]
+        self.add_classes([cls for classes in uniques_classes for cls in classes])
+        uniques_matrix = np.zeros((len(uniques), len(self.classes)), dtype=bool)
+        for row, classes in enumerate(uniques_classes):
+            uniques_matrix[row, [self.class2index[cls] for cls in classes]] = True
+        return uniques_matrix[codes]
+
+    def get_canonical_strs(self, labels_strs: Sequence[str]) -> np.ndarray:
+        """The labels strings as the store returns them (e.g. "B,A" as "A,B")."""
+        canonical_strs = np.array(labels_strs, dtype=object)
+        is_labeled = (canonical_strs != NA) & (canonical_strs != SKIP)
+        matrix = self.parse_strs(canonical_strs[is_labeled])
+        canonical_strs[is_labeled] = get_strs_from_labels_matrix(matrix, self.classes)
+        return canonical_strs
+
+    def set_gold(self, indices: np.ndarray, labels_strs: Sequence[str]) -> None:
+        matrix = self.parse_strs(labels_strs)
+        labels_strs = np.asarray(labels_strs, dtype=object)
+        status = np.full(len(labels_strs), LABELED, dtype=np.int8)
+        status[labels_strs == NA] = UNLABELED
+        status[labels_strs == SKIP] = SKIPPED
+        self.stats.update(self.status[indices], self.gold[indices], -1)
+        self.status[indices] = status
+        self.gold[indices] = matrix
+        self.stats.update(status, matrix, 1)
+
+    def set_predictions(self, classes: List[str], labels_matrix: np.ndarray, probs: np.ndarray) -> None:
+        columns = self.get_classes_indices(classes)
+        self.preds[:] = False
+        self.preds[:, columns] = labels_matrix
+        self.probs[:] = np.nan
+        self.probs[:, columns] = probs
+        self.pred_classes = list(classes)
+        self.stats.set_predictions(self.preds)
+
+    @property
+    def is_unlabeled(self) -> np.ndarray:
+        return self.status == UNLABELED
+
+    @property
+    def train_indices(self) -> np.ndarray:
+        return np.flatnonzero(self.status == LABELED)
+
+    @property
+    def num_annotated(self) -> int:
+        return self.stats.num_annotated
+
+    @property
+    def gold_classes(self) -> List[str]:
+        return sorted(cls for cls, count in zip(self.classes, self.stats.class_counts) if count > 0)
+
+    @property
+    def is_multilabel(self) -> bool:
+        return self.stats.num_multilabel > 0
+
+    def count_gold(self, label: str) -> int:
+        if label == NA:
+            return int(self.stats.status_counts[UNLABELED])
+        if label == SKIP:
+            return int(self.stats.status_counts[SKIPPED])
+        return int(self.stats.class_counts[self.class2index[label]]) if label in self.class2index else 0
+
+    def count_negatives(self, label: str) -> int:
+        """The labeled rows without the class."""
+        return self.stats.num_labeled - self.count_gold(label)
+
+    def count_preds(self, label: str) -> int:
+        if label == NA:
+            return self.stats.num_unpredicted
+        return int(self.stats.pred_counts[self.class2index[label]]) if label in self.class2index else 0
+
+    def get_subset(self, indices: np.ndarray, labels_strs: Optional[Sequence[str]] = None) -> "LabelStore":
+        """A store of some of the rows, with their predictions and either their labels or the given labels strings."""
+        subset = LabelStore.from_strs(self.get_gold_strs(indices) if labels_strs is None else labels_strs)
+        if self.pred_classes:
+            rows_columns = np.ix_(indices, self.get_classes_indices(self.pred_classes))
+            subset.set_predictions(self.pred_classes, self.preds[rows_columns], self.probs[rows_columns])
+        return subset
+
+    def get_snapshot(self) -> LabelsSnapshot:
+        train_indices = self.train_indices
+        classes = self.gold_classes
+        train_matrix = self.gold[np.ix_(train_indices, self.get_classes_indices(classes))]
+        return LabelsSnapshot(self.status.copy(), train_indices, train_matrix, classes)
+
+    def get_gold_mask(self, label: str) -> np.ndarray:
+        if label == NA:
+            return self.status == UNLABELED
+        if label == SKIP:
+            return self.status == SKIPPED
+        if label not in self.class2index:
+            return np.zeros(self.num_rows, dtype=bool)
+        return self.gold[:, self.class2index[label]]
+
+    def get_pred_mask(self, label: str) -> np.ndarray:
+        if label not in self.class2index:
+            return np.zeros(self.num_rows, dtype=bool)
+        return self.preds[:, self.class2index[label]]
+
+    def get_probs(self, label: str, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        probs = self.probs[:, self.class2index[label]]
+        return probs if indices is None else probs[indices]
+
+    def get_gold_strs(self, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        indices = np.arange(self.num_rows) if indices is None else np.asarray(indices)
+        status = self.status[indices]
+        strs = np.full(len(indices), NA, dtype=object)
+        strs[status == SKIPPED] = SKIP
+        is_labeled = status == LABELED
+        strs[is_labeled] = get_strs_from_labels_matrix(self.gold[indices[is_labeled]], self.classes)
+        return strs
+
+    def get_pred_strs(self, indices: Optional[np.ndarray] = None) -> np.ndarray:
+        indices = np.arange(self.num_rows) if indices is None else np.asarray(indices)
+        preds = self.preds[indices]
+        strs = np.full(len(indices), NA, dtype=object)
+        has_pred = preds.any(axis=1)
+        strs[has_pred] = get_strs_from_labels_matrix(preds[has_pred], self.classes)
+        return strs
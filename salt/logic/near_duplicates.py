@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from salt.constants import TEXT, CLUSTER
+
+NUM_PERMUTATIONS = 64
+NUM_SHINGLE_HASHES = 2**30
+PRIME = 2**31 - 1  # of the universal hashing of the shingles' hashes
+MIN_RECALL = 0.9  # of the candidate pairs at the threshold, when choosing the bands
+BLOCK_SIZE = 2_048  # texts hashed at once
+EDGES_BLOCK_SIZE = 100_000  # pairs of signatures compared at once
+GROUP_SIZE = "group_size"
+
+
+def get_minhash_signatures(
+    texts: List[str], num_permutations: int = NUM_PERMUTATIONS, seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The MinHash signatures (texts, permutations) of the sets of word uni- and bigrams of the texts (as the lexical
+    distances' CountVectorizer), and the size of each set. Texts without words get signatures of their own.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    vectorizer = HashingVectorizer(
+        ngram_range=(1, 2), n_features=NUM_SHINGLE_HASHES, binary=True, norm=None, alternate_sign=False
+    )
+    rng = np.random.default_rng(seed)
+    multipliers = rng.integers(1, PRIME, num_permutations, dtype=np.int64)
+    offsets = rng.integers(0, PRIME, num_permutations, dtype=np.int64)
+    signatures = np.empty((len(texts), num_permutations), dtype=np.uint32)
+    num_shingles = np.empty(len(texts), dtype=np.int32)
+    for start in range(0, len(texts), BLOCK_SIZE):
+        shingles = vectorizer.transform(texts[start : start + BLOCK_SIZE])
+        block_num_shingles = np.diff(shingles.indptr)
+        block_signatures = PRIME + np.arange(start, start + shingles.shape[0], dtype=np.int64)[:, None]
+        block_signatures = np.repeat(block_signatures, num_permutations, axis=1)
+        has_shingles = block_num_shingles > 0
+        shingles_hashes, starts = shingles.indices.astype(np.int64), shingles.indptr[:-1][has_shingles]
+        for permutation in range(num_permutations if shingles.nnz else 0):
+            hashes = (shingles_hashes * multipliers[permutation] + offsets[permutation]) % PRIME
+            block_signatures[has_shingles, permutation] = np.minimum.reduceat(hashes, starts)
+        signatures[start : start + BLOCK_SIZE] = block_signatures
+        num_shingles[start : start + BLOCK_SIZE] = block_num_shingles
+    return signatures, num_shingles
+
+
+def get_min_jaccard(cosine_similarity: float) -> float:
+    """The Jaccard similarity of sets of the same size at a (binary) cosine similarity, the highest it can be."""
+    return cosine_similarity / (2 - cosine_similarity)
+
+
+def get_lsh_bands(num_permutations: int, jaccard: float) -> Tuple[int, int]:
+    """
+    The number of bands and of rows per band of the locality-sensitive hashing: the most rows per band (the fewest
+    candidate pairs) that still make pairs at the given Jaccard similarity candidates with probability MIN_RECALL.
+    """
+    for rows in range(num_permutations, 0, -1):
+        bands = num_permutations // rows
+        if 1 - (1 - jaccard**rows) ** bands >= MIN_RECALL:
+            return bands, rows
+    return num_permutations, 1
+
+
+def get_estimated_cosine_similarities(
+    signatures: np.ndarray, num_shingles: np.ndarray, first: np.ndarray, second: np.ndarray
+) -> np.ndarray:
+    """The binary cosine similarities of pairs of texts, from the Jaccard similarities estimated by their signatures."""
+    similarities = np.empty(len(first))
+    for start in range(0, len(first), EDGES_BLOCK_SIZE):
+        block_first, block_second = first[start : start + EDGES_BLOCK_SIZE], second[start : start + EDGES_BLOCK_SIZE]
+        jaccard = (signatures[block_first] == signatures[block_second]).mean(axis=1)
+        sizes_first, sizes_second = num_shingles[block_first], num_shingles[block_second]
+        # |A & B| = J * (|A| + |B|) / (1 + J)
+        intersections = jaccard * (sizes_first + sizes_second) / (1 + jaccard)
+        similarities[start : start + EDGES_BLOCK_SIZE] = np.divide(
+            intersections,
+            np.sqrt(sizes_first * sizes_second.astype(np.float64)),
+            out=np.zeros(len(intersections)),
+            where=(sizes_first > 0) & (sizes_second > 0),
+        )
+    return np.clip(similarities, 0, 1)
+
+
+def find_near_duplicates(
+    signatures: np.ndarray, num_shingles: np.ndarray, distance_threshold: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Groups the texts whose lexical cosine distance is (estimated) below the threshold, by locality-sensitive hashing of
+    their MinHash signatures: the texts sharing a band of their signatures are candidate pairs, whose distance is then
+    estimated by their whole signatures. The groups are the connected components of the near-duplicate pairs.
+    Returns the group of each text and its estimated distance to the first text of its group.
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    num_texts, num_permutations = signatures.shape
+    similarity = 1 - distance_threshold
+    bands, rows = get_lsh_bands(num_permutations, get_min_jaccard(similarity))
+    indices = np.arange(num_texts)
+    first, second = [], []
+    for band in range(bands):
+        keys = np.zeros(num_texts, dtype=np.uint64)
+        for column in signatures[:, band * rows : (band + 1) * rows].T:
+            keys = keys * np.uint64(PRIME) + column  # wraps around
+        buckets, _ = pd.factorize(keys)
+        # buckets are numbered by first appearance, so each bucket's first text starts a new maximum
+        heads = np.flatnonzero(buckets > np.maximum.accumulate(np.concatenate([[-1], buckets[:-1]])))[buckets]
+        is_candidate = heads != indices
+        first.append(heads[is_candidate])
+        second.append(indices[is_candidate])
+
+    first, second = np.concatenate(first), np.concatenate(second)
+    pairs = np.unique(first * np.int64(num_texts) + second)
+    first, second = pairs // num_texts, pairs % num_texts
+    is_near = get_estimated_cosine_similarities(signatures, num_shingles, first, second) > similarity
+    graph = coo_matrix((np.ones(is_near.sum()), (first[is_near], second[is_near])), shape=(num_texts, num_texts))
+    _, groups = connected_components(graph, directed=False)
+
+    _, group_heads = np.unique(groups, return_index=True)  # the first text of each group
+    heads = group_heads[groups]
+    distances = 1 - get_estimated_cosine_similarities(signatures, num_shingles, heads, indices)
+    distances[heads == indices] = 0
+    return groups, distances
+
+
+def get_duplicates_report(df_clusters: pd.DataFrame) -> pd.DataFrame:
+    """The texts that have near-duplicates, by group of decreasing size."""
+    group_sizes = df_clusters.groupby(CLUSTER)[TEXT].transform("size")
+    df = df_clusters[[CLUSTER, TEXT]].assign(**{GROUP_SIZE: group_sizes})[group_sizes > 1]
+    return df.sort_values([GROUP_SIZE, CLUSTER], ascending=[False, True], kind="stable")
@@ -0,0 +1,126 @@
+import numpy as np
+from typing import Optional, Tuple
+
+MAX_ITER = 100
+TOL = 1e-4
+MEMORY = 10  # correction pairs kept by L-BFGS
+MAX_LINE_SEARCH_STEPS = 20
+ARMIJO = 1e-4
+
+
+class OneVsRestProblem:
+    """
+    The objectives of one logistic regression per class, as fitted by scikit-learn's LogisticRegression(
+    class_weight="balanced") with lbfgs: the weighted mean log-loss plus an L2 penalty of the coefficients (but not of
+    the intercept), scaled by the number of rows.
+    """
+
+    def __init__(self, vectors: np.ndarray, labels_matrix: np.ndarray):
+        num_rows = len(vectors)
+        self.x = np.hstack([vectors, np.ones((num_rows, 1), dtype=vectors.dtype)]).astype(np.float32)
+        self.y = labels_matrix.astype(np.float32)
+        num_positives = labels_matrix.sum(axis=0)
+        num_negatives = num_rows - num_positives
+        # the positives and the negatives of each class weigh half of the rows each
+        positive_weights = np.divide(0.5, num_positives, out=np.zeros(len(num_positives)), where=num_positives > 0)
+        negative_weights = np.divide(0.5, num_negatives, out=np.zeros(len(num_negatives)), where=num_negatives > 0)
+        self.sample_weights = np.where(labels_matrix, positive_weights, negative_weights).astype(np.float32)
+        self.penalty = np.full((self.x.shape[1], 1), 1 / num_rows)
+        self.penalty[-1] = 0
+
+    @property
+    def num_params(self) -> int:
+        return self.x.shape[1]
+
+    def evaluate(self, coef: np.ndarray, columns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """The losses (classes,) and gradients (params, classes) of some of the classes."""
+        from scipy.special import expit
+
+        logits = self.x @ coef.astype(np.float32)
+        y, sample_weights = self.y[:, columns], self.sample_weights[:, columns]
+        penalty = self.penalty * coef
+        losses = (sample_weights * (np.logaddexp(0, logits) - y * logits)).sum(axis=0, dtype=np.float64)
+        losses += (penalty * coef).sum(axis=0) / 2
+        grads = self.x.T @ (sample_weights * (expit(logits) - y)) + penalty
+        return losses, grads
+
+
+def get_lbfgs_directions(grads: np.ndarray, steps: list, grad_changes: list) -> np.ndarray:
+    """The L-BFGS two-loop recursion, for all the classes (columns) at once."""
+    directions = -grads
+    rhos, alphas = [], []
+    for step, grad_change in zip(reversed(steps), reversed(grad_changes)):
+        curvatures = (step * grad_change).sum(axis=0)
+        rho = np.divide(1, curvatures, out=np.zeros(len(curvatures)), where=curvatures > 1e-10)
+        alpha = rho * (step * directions).sum(axis=0)
+        directions -= alpha * grad_change
+        rhos.append(rho)
+        alphas.append(alpha)
+    if steps:
+        changes_norms = (grad_changes[-1] ** 2).sum(axis=0)
+        curvatures = (steps[-1] * grad_changes[-1]).sum(axis=0)
+        directions *= np.divide(curvatures, changes_norms, out=np.ones(len(curvatures)), where=curvatures > 1e-10)
+    for step, grad_change, rho, alpha in zip(steps, grad_changes, reversed(rhos), reversed(alphas)):
+        beta = rho * (grad_change * directions).sum(axis=0)
+        directions += (alpha - beta) * step
+    return directions
+
+
+def fit_one_vs_rest(
+    vectors: np.ndarray,
+    labels_matrix: np.ndarray,
+    initial_coef: Optional[np.ndarray] = None,
+    max_iter: int = MAX_ITER,
+    tol: float = TOL,
+) -> np.ndarray:
+    """
+    Fits the independent logistic regression of each class (column) of a boolean labels matrix, in lockstep:
+    a vectorized L-BFGS with a per-class history, step size and stopping criterion, so each iteration evaluates all the
+    classes that have not converged yet with a single matrix product.
+    Returns the (features + intercept, classes) coefficients.
+    """
+    problem = OneVsRestProblem(vectors, labels_matrix)
+    num_classes = labels_matrix.shape[1]
+    coef = np.zeros((problem.num_params, num_classes)) if initial_coef is None else initial_coef.copy()
+    losses, grads = problem.evaluate(coef, np.arange(num_classes))
+    is_active = np.abs(grads).max(axis=0) > tol
+    steps, grad_changes = [], []  # (params, classes) per iteration, only meaningful for the classes still active
+    for iteration in range(max_iter):
+        active = np.flatnonzero(is_active)
+        if len(active) == 0:
+            break
+
+        directions = get_lbfgs_directions(
+            grads[:, active], [step[:, active] for step in steps], [change[:, active] for change in grad_changes]
+        )
+        slopes = (grads[:, active] * directions).sum(axis=0)
+        is_ascent = slopes >= 0  # numerical issues: restart from the steepest descent
+        directions[:, is_ascent] = -grads[:, active][:, is_ascent]
+        slopes[is_ascent] = -(grads[:, active][:, is_ascent] ** 2).sum(axis=0)
+        step_sizes = np.ones(len(active))
+        if iteration == 0:
+            step_sizes /= np.maximum(1, np.sqrt(-slopes))
+
+        new_coef, new_losses, new_grads = coef[:, active].copy(), losses[active].copy(), grads[:, active].copy()
+        is_pending = np.ones(len(active), dtype=bool)
+        for _ in range(MAX_LINE_SEARCH_STEPS):  # backtracking until sufficient decrease
+            pending = np.flatnonzero(is_pending)
+            tried_coef = coef[:, active[pending]] + step_sizes[pending] * directions[:, pending]
+            tried_losses, tried_grads = problem.evaluate(tried_coef, active[pending])
+            is_accepted = tried_losses <= losses[active[pending]] + ARMIJO * step_sizes[pending] * slopes[pending]
+            accepted = pending[is_accepted]
+            new_coef[:, accepted] = tried_coef[:, is_accepted]
+            new_losses[accepted] = tried_losses[is_accepted]
+            new_grads[:, accepted] = tried_grads[:, is_accepted]
+            is_pending[accepted] = False
+            step_sizes[pending[~is_accepted]] /= 2
+            if not is_pending.any():
+                break
+
+        step, grad_change = np.zeros_like(coef), np.zeros_like(coef)
+        step[:, active] = new_coef - coef[:, active]
+        grad_change[:, active] = new_grads - grads[:, active]
+        steps, grad_changes = (steps + [step])[-MEMORY:], (grad_changes + [grad_change])[-MEMORY:]
+        coef[:, active], losses[active], grads[:, active] = new_coef, new_losses, new_grads
+        is_active[active] = (np.abs(new_grads).max(axis=0) > tol) & ~is_pending  # no decrease: as good as it gets
+    return coef
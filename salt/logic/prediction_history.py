@@ -0,0 +1,48 @@
+import numpy as np
+from typing import Optional
+
+HISTORY_LENGTH = 10
+POPCOUNTS = np.array([bin(byte).count("1") for byte in range(256)], dtype=np.uint8)
+
+
+def count_bits(packed: np.ndarray) -> np.ndarray:
+    """The number of set bits in each column of a bit-packed matrix."""
+    return POPCOUNTS[packed].sum(axis=0, dtype=np.int64)
+
+
+class PredictionHistory:
+    """
+    The last `length` prediction matrices of the whole dataset, bit-packed over the rows (one bit per row and class)
+    in a ring buffer. Each new prediction matrix is compared with the oldest one, which it then replaces.
+    """
+
+    def __init__(self, length: int = HISTORY_LENGTH):
+        self.length = length
+        self.buffer: Optional[np.ndarray] = None  # (length, packed rows, classes)
+        self.num_pushed = 0
+
+    @property
+    def is_full(self) -> bool:
+        return self.num_pushed >= self.length
+
+    def push(self, preds: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Adds a boolean (rows, classes) prediction matrix, whose classes may extend the previous ones.
+        Once the buffer is full, returns the change rate of each class since the oldest predictions: the rows whose
+        prediction of the class flipped, out of the rows predicted as the class in either (NaN if there are none).
+        """
+        packed = np.packbits(preds, axis=0)
+        if self.buffer is None:
+            self.buffer = np.zeros((self.length,) + packed.shape, dtype=np.uint8)
+        elif packed.shape[1] > self.buffer.shape[2]:  # new classes: never predicted before
+            self.buffer = np.pad(self.buffer, ((0, 0), (0, 0), (0, packed.shape[1] - self.buffer.shape[2])))
+
+        slot = self.num_pushed % self.length
+        change_rates = None
+        if self.is_full:
+            oldest = self.buffer[slot]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                change_rates = count_bits(oldest ^ packed) / count_bits(oldest | packed)
+        self.buffer[slot] = packed
+        self.num_pushed += 1
+        return change_rates
@@ -1,14 +1,22 @@
 import os
+import json
+import numpy as np
 import pandas as pd
 from glob import glob
 from datetime import datetime
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Optional
 from salt.logic.clusters import Clusters
 from salt.logic.filter import Filter, FilterParams
+from salt.logic.label_store import LabelStore
+from salt.logic.utils import get_prob_col
 from salt.logic.active_learning import ActiveLearningMechanism
+from salt.logic.ingest import ingest_dataframe, ingest_file, CHUNK_SIZE
+from salt.logic.query_strategies import QUERY_STRATEGIES
+from salt.logic.vector_store import has_vector_store, load_vector_store, dump_vector_store, dump_json
 from salt.constants import (
     TEXT,
-    VECTOR,
     DATE,
     LABEL,
     PRED,
@@ -17,10 +25,12 @@ from salt.constants import (
     NA,
     PROJECTS_DIR,
     EMBEDDINGS_FILE_NAME,
+    DISTANCES_DIR_NAME,
+    SETTINGS_FILE_NAME,
 )
 from salt.logic.embeddings import (
-    create_embeddings,
-    dump_embeddings,
+    EncodingParams,
+    get_encoding_params,
     load_embeddings,
     get_embeddings_dict,
     TEXTS_KEY,
@@ -30,6 +40,8 @@ from salt.logic.embeddings import (
     MODEL_NAME_KEY,
 )
 
+QUERY_STRATEGY_KEY = "query_strategy"
+
 
 def get_working_dir(project_name: str) -> str:
     return os.path.join(PROJECTS_DIR, project_name)
@@ -40,16 +52,30 @@ def get_embeddings_filepath(project_name: str) -> str:
 
 
 class SaltProject:
-    def __init__(self, name: str, embeddings: Dict, df: pd.DataFrame = None):
+    def __init__(self, name: str, embeddings: Dict, df: pd.DataFrame = None, query_strategy: Optional[str] = None):
         self.name = name
         self.df = SaltProject.init_state(embeddings, df)
-        self.al = ActiveLearningMechanism(self.df)
-        self.clusters = Clusters(self.df)
-        self.filter = Filter(self.clusters)
+        self.label_store = SaltProject.init_labels(self.df)
+        self.df = self.df.drop(
+            columns=[col for col in self.df.columns if col in [LABEL, PRED, PROB] or col.startswith(f"{PROB}_")]
+        )
+        self.vectors = SaltProject.init_vectors(embeddings)
+        self.metadata = embeddings.get(METADATA_KEY, {})
+        self.encoding_params = get_encoding_params(self.metadata)
+        self.executor = ThreadPoolExecutor(max_workers=1)  # background model updates
+        self.al = ActiveLearningMechanism(
+            self.df, self.vectors, self.label_store, executor=self.executor, query_strategy=query_strategy
+        )
+        self.clusters = Clusters(self.df, self.vectors, os.path.join(self.working_dir, DISTANCES_DIR_NAME))
+        self.filter = Filter(self.clusters, self.vectors, self.encoding_params, self.label_store)
+
+    def close(self) -> None:
+        """Stops the background model updates thread, once the project is replaced (e.g. by another loaded one)."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
 
     @property
     def num_annotations(self) -> int:
-        return len(self.df[self.df[LABEL] != NA])
+        return self.label_store.num_annotated
 
     @property
     def working_dir(self) -> str:
@@ -62,18 +88,58 @@ class SaltProject:
     @staticmethod
     def init_state(embeddings: Dict, df: pd.DataFrame = None):
         if df is None:
-            df = pd.DataFrame({TEXT: embeddings[TEXTS_KEY], VECTOR: embeddings[VECTORS_KEY]})
+            df = pd.DataFrame({TEXT: embeddings[TEXTS_KEY]})
             df[LABEL] = embeddings.get(LABELS_KEY, NA)  # backward-compatibility
             df[DATE] = datetime(1, 1, 1)
-            df[PRED] = NA
-            df[PROB] = NA
-        else:
-            df[VECTOR] = embeddings[VECTORS_KEY]
         df[CLUSTER] = NA
         return df
 
+    @staticmethod
+    def init_labels(df: pd.DataFrame) -> LabelStore:
+        label_store = LabelStore.from_strs(df[LABEL].to_numpy())
+        prob_cols = [col for col in df.columns if col.startswith(f"{PROB}_")]
+        if prob_cols:  # the predictions of a loaded state
+            classes = [col[len(PROB) + 1 :] for col in prob_cols]
+            preds_matrix = label_store.parse_strs(df[PRED].to_numpy())[:, label_store.get_classes_indices(classes)]
+            probs = df[prob_cols].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float32)
+            label_store.set_predictions(classes, preds_matrix, probs)
+        return label_store
+
+    @staticmethod
+    def init_vectors(embeddings: Dict) -> np.ndarray:
+        vectors = embeddings[VECTORS_KEY]
+        if isinstance(vectors, np.ndarray):  # e.g. memory-mapped from the vector store
+            return vectors
+        return np.asarray(vectors, dtype=np.float32)  # backward-compatibility
+
+    def get_state_df(self) -> pd.DataFrame:
+        """The project state with labels strings, as dumped to the state files."""
+        df = self.df.copy()
+        df.insert(1, LABEL, self.label_store.get_gold_strs())
+        df.insert(3, PRED, self.label_store.get_pred_strs())
+        for cls in self.label_store.pred_classes:
+            df[get_prob_col(cls)] = self.label_store.get_probs(cls)
+        return df
+
     def dump_state(self) -> None:
-        self.df.drop(columns={VECTOR}).to_csv(f"{self.working_dir}/{self.state_filename}", index=False)
+        self.get_state_df().to_csv(f"{self.working_dir}/{self.state_filename}", index=False)
+        self.dump_settings()
+
+    def dump_settings(self) -> None:
+        """The labeling settings chosen for the project (None: the default of the mode)."""
+        dump_json({QUERY_STRATEGY_KEY: self.al.query_strategy}, os.path.join(self.working_dir, SETTINGS_FILE_NAME))
+
+    @staticmethod
+    def load_settings(project_name: str) -> Dict:
+        settings_path = os.path.join(get_working_dir(project_name), SETTINGS_FILE_NAME)
+        if not os.path.exists(settings_path):
+            return {}
+        with open(settings_path) as f:
+            return json.load(f)
+
+    def set_query_strategy(self, query_strategy: Optional[str]) -> None:
+        self.al.set_query_strategy(query_strategy)
+        self.dump_settings()
 
     @staticmethod
     def create(
@@ -82,38 +148,84 @@ class SaltProject:
         label_column: str,
         project_name: str,
         base_project_name: Optional[str] = None,
+        params: Optional[EncodingParams] = None,
     ) -> "SaltProject":
 
         if base_project_name:
             base_project = SaltProject.load(base_project_name)
-            return base_project.extend(df, text_column, label_column, project_name)
+            try:
+                return base_project.extend(df, text_column, label_column, project_name, params)
+            finally:
+                base_project.close()
+
+        ingest_dataframe(df, text_column, label_column, get_working_dir(project_name), params)
+        return SaltProject(project_name, load_vector_store(get_working_dir(project_name)))
+
+    @staticmethod
+    def create_from_file(
+        path: str,
+        text_column: str,
+        label_column: Optional[str],
+        project_name: str,
+        params: Optional[EncodingParams] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ) -> "SaltProject":
+        ingest_file(path, text_column, label_column, get_working_dir(project_name), params, chunk_size)
+        return SaltProject(project_name, load_vector_store(get_working_dir(project_name)))
 
-        embeddings = create_embeddings(df, text_column, label_column)
-        dump_embeddings(embeddings, get_embeddings_filepath(project_name))
-        return SaltProject(project_name, embeddings)
+    @staticmethod
+    def load_embeddings(project_name: str) -> Dict:
+        working_dir = get_working_dir(project_name)
+        if has_vector_store(working_dir):
+            return load_vector_store(working_dir)
+        return load_embeddings(get_embeddings_filepath(project_name))  # backward-compatibility
 
     @staticmethod
     def load(project_name: str) -> "SaltProject":
-        embeddings = load_embeddings(get_embeddings_filepath(project_name))
+        embeddings = SaltProject.load_embeddings(project_name)
         state_files = sorted(glob(f"{get_working_dir(project_name)}/*.csv"))
         df = pd.read_csv(state_files[-1], na_filter=False) if state_files else None
-        return SaltProject(project_name, embeddings, df)
-
-    def extend(self, df: pd.DataFrame, text_column: str, label_column: str, project_name: str) -> "SaltProject":
-        new_project = SaltProject.create(df, text_column, label_column, project_name)
-        new_rows = [row for _, row in new_project.df.iterrows() if row[TEXT] not in self.df[TEXT]]
+        query_strategy = SaltProject.load_settings(project_name).get(QUERY_STRATEGY_KEY)
+        if query_strategy not in QUERY_STRATEGIES:  # e.g. a strategy that was removed since
+            query_strategy = None
+        return SaltProject(project_name, embeddings, df, query_strategy)
 
-        df_extended = pd.concat([self.df, pd.DataFrame(new_rows)]).reset_index(drop=True)
-        extended_embeddings = get_embeddings_dict(df_extended[TEXT], df_extended[VECTOR], df_extended[LABEL])
-        dump_embeddings(extended_embeddings, get_embeddings_filepath(project_name))
-
-        extended_project = SaltProject(project_name, extended_embeddings, df_extended)
+    def extend(
+        self,
+        df: pd.DataFrame,
+        text_column: str,
+        label_column: str,
+        project_name: str,
+        params: Optional[EncodingParams] = None,
+    ) -> "SaltProject":
+        # the new texts must be embedded by the same encoder as the base project's texts
+        params = replace(
+            params or EncodingParams(),
+            model_name=self.encoding_params.model_name,
+            backend=self.encoding_params.backend,
+            segmenter=self.encoding_params.segmenter,
+        )
+        new_project = SaltProject.create(df, text_column, label_column, project_name, params=params)
+        new_project.close()  # only its texts and vectors are used
+        is_new = ~new_project.df[TEXT].isin(self.df[TEXT])
+
+        df_extended = pd.concat([self.get_state_df(), new_project.get_state_df()[is_new]]).reset_index(drop=True)
+        vectors_extended = np.concatenate([self.vectors, new_project.vectors[is_new.to_numpy()]])
+        extended_embeddings = get_embeddings_dict(
+            df_extended[TEXT].to_list(),
+            vectors_extended,
+            df_extended[LABEL].to_list(),
+            params,
+        )
+        dump_vector_store(extended_embeddings, get_working_dir(project_name))
+
+        extended_project = SaltProject(project_name, extended_embeddings, df_extended, self.al.query_strategy)
         extended_project.dump_state()
         return extended_project
 
     def update_clusters(self, df_clusters: pd.DataFrame) -> None:
-        text2cluster = {row[TEXT]: row[CLUSTER] for _, row in df_clusters.iterrows()}
-        self.df[CLUSTER] = self.df[TEXT].apply(lambda text: text2cluster.get(text, NA))
+        """Sets the clusters of the clustered texts (by the index of the project's df), and NA to the other texts."""
+        self.df[CLUSTER] = df_clusters[CLUSTER].astype(object).reindex(self.df.index, fill_value=NA)
 
     def get_data(self, params: FilterParams = None) -> pd.DataFrame:
         if not params:
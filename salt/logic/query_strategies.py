@@ -0,0 +1,91 @@
+import numpy as np
+from typing import Callable, Dict, List, Optional
+
+LEAST_CONFIDENCE = "least-confidence"
+MARGIN = "margin"
+ENTROPY = "entropy"
+MEAN_UNCERTAINTY = "mean-uncertainty"
+FOCUS_CLASS = "focus-class"
+DEFAULT_SINGLE_LABEL_STRATEGY = LEAST_CONFIDENCE
+DEFAULT_MULTILABEL_STRATEGY = FOCUS_CLASS
+MIN_PROB = 1e-12
+
+# the uncertainty of each row of a (rows, classes) probabilities matrix (the higher, the more uncertain), given whether
+# the classes are independent (multi-label) and the number of labels the model was fitted on
+QueryStrategy = Callable[[np.ndarray, bool, int], np.ndarray]
+
+QUERY_STRATEGIES: Dict[str, QueryStrategy] = {}
+MULTILABEL_ONLY_STRATEGIES = set()
+# strategies that depend on the number of labels only through their scope, `num_labels % num_classes` (e.g. the focus
+# class): the uncertainties of different scopes are not comparable, so the uncertainty index keeps a pool per scope
+SCOPED_STRATEGIES = set()
+
+
+def register_query_strategy(name: str, multilabel_only: bool = False, scoped: bool = False) -> Callable:
+    def register(strategy: QueryStrategy) -> QueryStrategy:
+        QUERY_STRATEGIES[name] = strategy
+        if multilabel_only:
+            MULTILABEL_ONLY_STRATEGIES.add(name)
+        if scoped:
+            SCOPED_STRATEGIES.add(name)
+        return strategy
+
+    return register
+
+
+def get_binary_margins(probs: np.ndarray) -> np.ndarray:
+    """How far each class's probability is from the decision threshold, scaled to [0, 1]."""
+    return np.abs(2 * probs - 1)
+
+
+@register_query_strategy(LEAST_CONFIDENCE)
+def least_confidence(probs: np.ndarray, is_multilabel: bool, num_labels: int) -> np.ndarray:
+    if is_multilabel:  # the least confident of the per-class decisions
+        return 1 - np.maximum(probs, 1 - probs).min(axis=1)
+    return 1 - probs.max(axis=1)
+
+
+@register_query_strategy(MARGIN)
+def margin(probs: np.ndarray, is_multilabel: bool, num_labels: int) -> np.ndarray:
+    if is_multilabel:
+        return 1 - get_binary_margins(probs).min(axis=1)
+    top_two = np.partition(probs, -2, axis=1)[:, -2:]
+    return 1 - (top_two[:, 1] - top_two[:, 0])
+
+
+@register_query_strategy(ENTROPY)
+def entropy(probs: np.ndarray, is_multilabel: bool, num_labels: int) -> np.ndarray:
+    probs = np.clip(probs, MIN_PROB, 1 - MIN_PROB)
+    entropies = -probs * np.log(probs)
+    if is_multilabel:  # the sum of the per-class binary entropies
+        entropies -= (1 - probs) * np.log(1 - probs)
+    return entropies.sum(axis=1)
+
+
+@register_query_strategy(MEAN_UNCERTAINTY, multilabel_only=True)
+def mean_uncertainty(probs: np.ndarray, is_multilabel: bool, num_labels: int) -> np.ndarray:
+    return 1 - get_binary_margins(probs).mean(axis=1)
+
+
+@register_query_strategy(FOCUS_CLASS, multilabel_only=True, scoped=True)
+def focus_class(probs: np.ndarray, is_multilabel: bool, num_labels: int) -> np.ndarray:
+    """The uncertainty of a single class, rotating with each new label."""
+    focus_index = num_labels % probs.shape[1]
+    return -np.abs(probs[:, focus_index] - 0.5)
+
+
+def get_query_scope(name: str, num_classes: int, num_labels: int) -> Optional[int]:
+    return num_labels % num_classes if name in SCOPED_STRATEGIES else None
+
+
+def get_query_strategies(is_multilabel: bool) -> List[str]:
+    return [name for name in QUERY_STRATEGIES if is_multilabel or name not in MULTILABEL_ONLY_STRATEGIES]
+
+
+def get_query_strategy_name(name: Optional[str], is_multilabel: bool) -> str:
+    """The given strategy, or the default one of the mode if there is none or it does not apply to the mode."""
+    if name is not None and name not in QUERY_STRATEGIES:
+        raise ValueError(f"Unknown query strategy: {name} (available: {', '.join(QUERY_STRATEGIES)})")
+    if name is None or name not in get_query_strategies(is_multilabel):
+        return DEFAULT_MULTILABEL_STRATEGY if is_multilabel else DEFAULT_SINGLE_LABEL_STRATEGY
+    return name
@@ -0,0 +1,90 @@
+import os
+import uuid
+from pathlib import Path
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO, List
+
+MAX_SEGMENTS = 32
+
+
+class SegmentStore(ABC):
+    """
+    On-disk store made of immutable segments, each of one file per suffix of `SUFFIXES`. The files are written in
+    that order (each to a temporary file first), so a segment is complete once its last file exists.
+    A segment's mtime (of its last file) marks its last hit, and least recently used segments are evicted beyond
+    `max_size` bytes. Subclasses define how a segment's data is written, read and merged.
+    """
+
+    SUFFIXES: List[str] = []
+
+    def __init__(self, path: Path, max_size: int):
+        self.path = path
+        self.max_size = max_size
+
+    @abstractmethod
+    def write_file(self, f: BinaryIO, suffix: str, data: Any) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def read_segment(self, segment: str) -> Any:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def merge(self, datas: List[Any]) -> Any:
+        raise NotImplementedError()
+
+    def get_segments(self) -> List[str]:
+        if not self.path.is_dir():
+            return []
+        last_suffix = self.SUFFIXES[-1]
+        return sorted(p.name[: -len(last_suffix)] for p in self.path.glob(f"*{last_suffix}"))
+
+    def get_segment_path(self, segment: str, suffix: str) -> Path:
+        return self.path.joinpath(f"{segment}{suffix}")
+
+    def get_segment_size(self, segment: str) -> int:
+        return sum(self.get_segment_path(segment, suffix).stat().st_size for suffix in self.SUFFIXES)
+
+    def get_last_used(self, segment: str) -> float:
+        return self.get_segment_path(segment, self.SUFFIXES[-1]).stat().st_mtime
+
+    def touch(self, segment: str) -> None:
+        os.utime(self.get_segment_path(segment, self.SUFFIXES[-1]))
+
+    def add(self, data: Any) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.write_segment(uuid.uuid4().hex, data)
+        self.compact()
+        self.evict()
+
+    def write_segment(self, segment: str, data: Any) -> None:
+        for suffix in self.SUFFIXES:
+            tmp_path = self.get_segment_path(segment, f"{suffix}.tmp")
+            with open(tmp_path, "wb") as f:
+                self.write_file(f, suffix, data)
+            os.replace(tmp_path, self.get_segment_path(segment, suffix))
+
+    def remove_segment(self, segment: str) -> None:
+        for suffix in reversed(self.SUFFIXES):  # last file first, so a half-removed segment is never read
+            self.get_segment_path(segment, suffix).unlink(missing_ok=True)
+
+    def compact(self) -> None:
+        """Merges the smaller half of the segments into a single one, once there are too many of them."""
+        segments = self.get_segments()
+        if len(segments) <= MAX_SEGMENTS:
+            return
+
+        to_merge = sorted(segments, key=self.get_segment_size)[: len(segments) // 2]
+        self.write_segment(uuid.uuid4().hex, self.merge([self.read_segment(segment) for segment in to_merge]))
+        for segment in to_merge:
+            self.remove_segment(segment)
+
+    def evict(self) -> None:
+        segments = self.get_segments()
+        last_used = {segment: self.get_last_used(segment) for segment in segments}
+        total_size = sum(self.get_segment_size(segment) for segment in segments)
+        for segment in sorted(segments, key=last_used.get):
+            if total_size <= self.max_size:
+                break
+            total_size -= self.get_segment_size(segment)
+            self.remove_segment(segment)
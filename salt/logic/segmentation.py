@@ -0,0 +1,160 @@
+import re
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from functools import cache
+from itertools import chain
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Dict, List, Optional
+from salt.constants import SEGMENTATION_CACHE_DIR, SEGMENTATION_CACHE_MAX_SIZE
+from salt.logic.encoding_pool import get_num_workers
+from salt.logic.segment_store import SegmentStore
+from salt.logic.embedding_cache import get_sentences_hashes
+
+PUNKT = "punkt"
+REGEX = "regex"
+DEFAULT_SEGMENTER = PUNKT
+PUNKT_RESOURCE = "tokenizers/punkt"
+SENTENCE_END_PATTERN = r"(?<=[.!?])\s+"
+CHUNK_SIZE = 1_000  # texts per task of the segmentation pool
+HASH_COLUMN = "hash"
+SENTENCES_COLUMN = "sentences"
+SEGMENT_SUFFIX = ".parquet"
+
+SEGMENTERS: Dict[str, Callable[[List[str]], List[List[str]]]] = {}
+
+logger = logging.getLogger(__name__)
+
+
+def register_segmenter(name: str) -> Callable:
+    def register(segment: Callable[[List[str]], List[List[str]]]) -> Callable[[List[str]], List[List[str]]]:
+        SEGMENTERS[name] = segment
+        return segment
+
+    return register
+
+
+@register_segmenter(PUNKT)
+def punkt_segment(texts: List[str]) -> List[List[str]]:
+    from nltk import sent_tokenize
+
+    return [sent_tokenize(text) for text in texts]
+
+
+@register_segmenter(REGEX)
+def regex_segment(texts: List[str]) -> List[List[str]]:
+    """Splits after sentence-ending punctuation: less accurate than Punkt, but much faster."""
+    stripped = pd.Series(texts, dtype="object").str.strip()
+    texts_sentences = stripped.str.split(SENTENCE_END_PATTERN, regex=True).to_list()
+    for i in np.flatnonzero(stripped.str.len().to_numpy() == 0):
+        texts_sentences[i] = []
+    return texts_sentences
+
+
+@cache
+def has_punkt() -> bool:
+    import nltk
+
+    try:
+        nltk.data.find(PUNKT_RESOURCE)
+    except LookupError:
+        if not nltk.download("punkt", quiet=True, raise_on_error=False):
+            logger.warning("The nltk punkt data is not available offline, falling back to the regex segmenter.")
+            return False
+    return True
+
+
+def get_available_segmenter(segmenter: str) -> str:
+    if segmenter not in SEGMENTERS:
+        raise ValueError(f"Unknown segmenter: {segmenter} (available: {', '.join(SEGMENTERS)})")
+    return REGEX if segmenter == PUNKT and not has_punkt() else segmenter
+
+
+class SegmentationCache(SegmentStore):
+    """
+    On-disk cache of the sentences of texts split by a single segmenter, keyed by text hash.
+    Each segment is a parquet file of (hash, sentences) rows.
+    """
+
+    SUFFIXES = [SEGMENT_SUFFIX]
+
+    def __init__(
+        self, segmenter: str, cache_dir: str = SEGMENTATION_CACHE_DIR, max_size: int = SEGMENTATION_CACHE_MAX_SIZE
+    ):
+        super().__init__(Path(cache_dir).joinpath(segmenter), max_size)
+
+    def write_file(self, f: BinaryIO, suffix: str, data: pd.DataFrame) -> None:
+        data.to_parquet(f, index=False)
+
+    def read_segment(self, segment: str) -> pd.DataFrame:
+        return pd.read_parquet(self.get_segment_path(segment, SEGMENT_SUFFIX))
+
+    def merge(self, datas: List[pd.DataFrame]) -> pd.DataFrame:
+        return pd.concat(datas).drop_duplicates(HASH_COLUMN)
+
+    def get(self, hashes: np.ndarray) -> Dict[int, List[str]]:
+        hash2sentences = {}
+        for segment in self.get_segments():
+            segment_path = self.get_segment_path(segment, SEGMENT_SUFFIX)
+            try:
+                keys = pd.read_parquet(segment_path, columns=[HASH_COLUMN])[HASH_COLUMN].to_numpy()
+                is_hit = np.isin(keys, hashes)
+                if not is_hit.any():
+                    continue
+                segment_df = pd.read_parquet(segment_path)[is_hit]
+                self.touch(segment)
+            except (FileNotFoundError, OSError):  # evicted by another process
+                continue
+            hash2sentences.update(zip(segment_df[HASH_COLUMN].tolist(), segment_df[SENTENCES_COLUMN].map(list)))
+        return hash2sentences
+
+    def put(self, hashes: np.ndarray, texts_sentences: List[List[str]]) -> None:
+        if len(hashes) == 0:
+            return
+        self.add(pd.DataFrame({HASH_COLUMN: hashes, SENTENCES_COLUMN: texts_sentences}))
+
+
+def create_segmentation_pool(num_workers: int) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=get_num_workers(num_workers), mp_context=get_context("spawn"))
+
+
+def split_texts(
+    texts: List[str], segmenter: str, num_workers: int = 1, executor: Optional[ProcessPoolExecutor] = None
+) -> List[List[str]]:
+    chunks = [texts[start : start + CHUNK_SIZE] for start in range(0, len(texts), CHUNK_SIZE)]
+    segment = SEGMENTERS[segmenter]
+    if num_workers == 1 or len(chunks) <= 1:
+        return list(chain.from_iterable(segment(chunk) for chunk in chunks))
+
+    if executor is None:
+        with create_segmentation_pool(min(get_num_workers(num_workers), len(chunks))) as executor:
+            return split_texts(texts, segmenter, num_workers, executor)
+    return list(chain.from_iterable(executor.map(segment, chunks)))
+
+
+def segment_texts(
+    texts: List[str],
+    segmenter: str = DEFAULT_SEGMENTER,
+    num_workers: int = 1,
+    executor: Optional[ProcessPoolExecutor] = None,
+) -> List[List[str]]:
+    """
+    Splits each text into sentences, splitting only the texts that were never split by this segmenter before
+    (in `executor`, a pool from `create_segmentation_pool`, if given).
+    """
+    segmenter = get_available_segmenter(segmenter)
+    hashes = get_sentences_hashes(texts)
+    cache = SegmentationCache(segmenter)
+    hash2sentences = cache.get(hashes)
+
+    is_missing = np.array([h not in hash2sentences for h in hashes.tolist()], dtype=bool)
+    missing_hashes, missing_indices = np.unique(hashes[is_missing], return_index=True)
+    missing_texts = [texts[i] for i in np.flatnonzero(is_missing)[missing_indices]]
+    missing_sentences = split_texts(missing_texts, segmenter, num_workers, executor)
+    cache.put(missing_hashes, missing_sentences)
+
+    hash2sentences.update(zip(missing_hashes.tolist(), missing_sentences))
+    logger.info(f"Segmentation cache: {len(texts) - is_missing.sum()} hits, {is_missing.sum()} misses")
+    return [hash2sentences[h] for h in hashes.tolist()]
@@ -0,0 +1,68 @@
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+POOL_SIZE = 1_000
+RESCORE_INTERVAL = 10
+
+
+class UncertaintyIndex:
+    """
+    The most uncertain unlabeled rows (the candidates) of the last full pass over the unlabeled pool.
+    Between full passes, only the candidates are re-scored by the latest model: a full pass is due once every
+    `rescore_interval` steps, when all the candidates are labeled, or when the whole pool fits in the candidates.
+    Scoped query strategies (e.g. focus-class) get candidates per scope, all picked by the same full pass:
+    `candidates` and `scores` are those of the current scope.
+    """
+
+    def __init__(self, pool_size: int = POOL_SIZE, rescore_interval: int = RESCORE_INTERVAL):
+        self.pool_size = pool_size
+        self.rescore_interval = rescore_interval
+        self.candidates = np.zeros(0, dtype=np.int64)
+        self.scores = np.zeros(0)
+        self.is_exhaustive = True
+        self.steps_since_full_pass = 0
+        self.scope: Optional[int] = None
+        self.scope2candidates: Dict[Optional[int], Tuple[np.ndarray, np.ndarray]] = {}  # of the other scopes
+
+    @property
+    def is_full_pass_due(self) -> bool:
+        is_interval_over = self.steps_since_full_pass + 1 >= self.rescore_interval
+        return self.is_exhaustive or len(self.candidates) == 0 or is_interval_over
+
+    def rebuild(
+        self, unlabeled_indices: np.ndarray, scope2scores: Dict[Optional[int], np.ndarray], scope: Optional[int]
+    ) -> None:
+        """
+        Keeps the `pool_size` most uncertain of the unlabeled rows in each scope, given their scores by the latest
+        model, and sets the current scope.
+        """
+        self.is_exhaustive = len(unlabeled_indices) <= self.pool_size
+        self.scope2candidates = {}
+        for scores_scope, scores in scope2scores.items():
+            if self.is_exhaustive:
+                top = np.arange(len(unlabeled_indices))
+            else:
+                top = np.argpartition(-scores, self.pool_size - 1)[: self.pool_size]
+            self.scope2candidates[scores_scope] = (unlabeled_indices[top], scores[top])
+        self.scope = scope
+        self.candidates, self.scores = self.scope2candidates.pop(scope, (self.candidates[:0], self.scores[:0]))
+        self.steps_since_full_pass = 0
+
+    def set_scope(self, scope: Optional[int]) -> None:
+        """Switches to the candidates of the scope (none if the last full pass had no such scope)."""
+        if scope == self.scope:
+            return
+        self.scope2candidates[self.scope] = (self.candidates, self.scores)
+        self.candidates, self.scores = self.scope2candidates.pop(scope, (self.candidates[:0], self.scores[:0]))
+        self.scope = scope
+
+    def rescore(self, scores: np.ndarray) -> None:
+        self.scores = scores
+        self.steps_since_full_pass += 1
+
+    def request_full_pass(self) -> None:
+        self.steps_since_full_pass = self.rescore_interval
+
+    def keep(self, is_kept: np.ndarray) -> None:
+        self.candidates = self.candidates[is_kept]
+        self.scores = self.scores[is_kept]
@@ -1,3 +1,4 @@
+import numpy as np
 from typing import List
 from functools import cache
 from itertools import chain
@@ -20,3 +21,14 @@ def get_str_from_labels(labels: List[str]) -> str:
 
 def get_classes_from_labels(labels_strs: List[str]) -> List[str]:
     return sorted(set(chain.from_iterable([get_labels_from_str(s) for s in labels_strs])))
+
+
+def get_strs_from_labels_matrix(labels_matrix: np.ndarray, classes: List[str]) -> np.ndarray:
+    """The labels string of each row of a boolean (rows, classes) matrix, joined once per distinct row."""
+    if len(labels_matrix) == 0 or len(classes) == 0:
+        return np.full(len(labels_matrix), get_str_from_labels([]), dtype=object)
+    packed_rows = np.ascontiguousarray(np.packbits(labels_matrix, axis=1))
+    row_keys = packed_rows.view(np.dtype((np.void, packed_rows.shape[1]))).ravel()
+    _, first_indices, inverse = np.unique(row_keys, return_index=True, return_inverse=True)
+    strs = [get_str_from_labels([classes[i] for i in np.flatnonzero(labels_matrix[row])]) for row in first_indices]
+    return np.array(strs, dtype=object)[inverse.ravel()]
@@ -0,0 +1,110 @@
+import os
+import json
+import argparse
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List, Tuple
+from salt.constants import (
+    TEXT,
+    LABEL,
+    PROJECTS_DIR,
+    EMBEDDINGS_FILE_NAME,
+    VECTORS_FILE_NAME,
+    RECORDS_FILE_NAME,
+    METADATA_FILE_NAME,
+)
+from salt.logic.embeddings import load_embeddings, TEXTS_KEY, VECTORS_KEY, LABELS_KEY, METADATA_KEY
+
+DTYPE_KEY = "dtype"
+SHAPE_KEY = "shape"
+VECTORS_DTYPE = "float32"
+SUPPORTED_DTYPES = ["float32", "float16"]
+
+
+def get_store_path(dir_path: str, file_name: str) -> Path:
+    return Path(dir_path).joinpath(file_name)
+
+
+def has_vector_store(dir_path: str) -> bool:
+    return get_store_path(dir_path, METADATA_FILE_NAME).exists()
+
+
+def dump_json(data: Dict, path: Path) -> None:
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def dump_records(records: pd.DataFrame, dir_path: str) -> None:
+    records_path = get_store_path(dir_path, RECORDS_FILE_NAME)
+    records[[TEXT, LABEL]].to_parquet(f"{records_path}.tmp", index=False)
+    os.replace(f"{records_path}.tmp", records_path)
+
+
+def dump_metadata(metadata: Dict, dir_path: str, dtype: str, shape: Tuple[int, int]) -> None:
+    # the metadata file is written last, so a store without it is an incomplete one
+    dump_json({**metadata, DTYPE_KEY: dtype, SHAPE_KEY: list(shape)}, get_store_path(dir_path, METADATA_FILE_NAME))
+
+
+def dump_vector_store(embeddings: Dict, dir_path: str, dtype: str = VECTORS_DTYPE) -> None:
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported vectors dtype: {dtype}")
+
+    Path(dir_path).mkdir(parents=True, exist_ok=True)
+    vectors = np.asarray(embeddings[VECTORS_KEY], dtype=dtype)
+    vectors_path = get_store_path(dir_path, VECTORS_FILE_NAME)
+    vectors.tofile(f"{vectors_path}.tmp")
+    os.replace(f"{vectors_path}.tmp", vectors_path)
+
+    dump_records(pd.DataFrame({TEXT: list(embeddings[TEXTS_KEY]), LABEL: list(embeddings[LABELS_KEY])}), dir_path)
+    dump_metadata(embeddings[METADATA_KEY], dir_path, dtype, vectors.shape)
+
+
+def load_vector_store(dir_path: str) -> Dict:
+    with open(get_store_path(dir_path, METADATA_FILE_NAME)) as f:
+        metadata = json.load(f)
+    dtype, shape = metadata.pop(DTYPE_KEY), tuple(metadata.pop(SHAPE_KEY))
+    vectors_path = get_store_path(dir_path, VECTORS_FILE_NAME)
+    vectors = np.memmap(vectors_path, dtype=dtype, mode="r", shape=shape) if shape[0] else np.zeros(shape, dtype)
+    records = pd.read_parquet(get_store_path(dir_path, RECORDS_FILE_NAME))
+    return {
+        TEXTS_KEY: records[TEXT].to_list(),
+        VECTORS_KEY: vectors,
+        LABELS_KEY: records[LABEL].to_list(),
+        METADATA_KEY: metadata,
+    }
+
+
+def migrate_embeddings_file(dir_path: str, dtype: str = VECTORS_DTYPE, remove_pickle: bool = False) -> bool:
+    pickle_path = get_store_path(dir_path, EMBEDDINGS_FILE_NAME)
+    if has_vector_store(dir_path) or not pickle_path.exists():
+        return False
+
+    dump_vector_store(load_embeddings(str(pickle_path)), dir_path, dtype)
+    if remove_pickle:
+        pickle_path.unlink()
+    return True
+
+
+def get_project_dirs(project_names: List[str]) -> List[Path]:
+    projects_dir = Path(PROJECTS_DIR)
+    if project_names:
+        return [projects_dir.joinpath(name) for name in project_names]
+    return sorted(p for p in projects_dir.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate projects from embeddings.pkl into the vector store format")
+    parser.add_argument("projects", nargs="*", help="project names (default: all projects)")
+    parser.add_argument("--dtype", choices=SUPPORTED_DTYPES, default=VECTORS_DTYPE)
+    parser.add_argument("--remove-pickle", action="store_true", help="delete embeddings.pkl after migration")
+    args = parser.parse_args()
+
+    for project_dir in get_project_dirs(args.projects):
+        migrated = migrate_embeddings_file(str(project_dir), args.dtype, args.remove_pickle)
+        print(f"{project_dir.name}: {'migrated' if migrated else 'skipped'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,41 +2,93 @@
 # scikit-learn==1.3.2
 # sentence-transformers==2.2.2
 
+import re
 import nltk
 import pickle
 import numpy as np
 from tqdm.auto import tqdm
+from functools import cache
+from typing import Callable, Dict, List, Tuple
 from sklearn.linear_model import LogisticRegression
 from sentence_transformers import SentenceTransformer
 
-nltk.download('punkt')
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ENCODER_BACKEND = "torch"
+SEGMENTER = "punkt"
 
-def load_model(path: str) -> LogisticRegression:
+
+def load_torch_encoder(model_name: str) -> SentenceTransformer:
+    return SentenceTransformer(model_name)
+
+
+def load_quantized_encoder(model_name: str) -> SentenceTransformer:
+    import torch
+
+    encoder = SentenceTransformer(model_name, device="cpu")
+    return torch.quantization.quantize_dynamic(encoder, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# must match the encoder backend the project was created with
+ENCODER_BACKENDS: Dict[str, Callable[[str], SentenceTransformer]] = {
+    "torch": load_torch_encoder,
+    "torch-int8": load_quantized_encoder,
+}
+
+
+def load_model(path: str) -> Tuple[LogisticRegression, Dict]:
     with open(path, "rb") as f:
-        return pickle.load(f)
+        exported = pickle.load(f)
+    if isinstance(exported, dict):  # a model exported with its project metadata
+        return exported["model"], exported["metadata"]
+    return exported, {}
+
+
+def load_encoder(metadata: Dict) -> SentenceTransformer:
+    model_name = metadata.get("model_name", MODEL_NAME)
+    backend = metadata.get("encoder_backend", ENCODER_BACKEND)
+    return ENCODER_BACKENDS[backend](model_name)
+
+
+def regex_split_sentences(text: str) -> List[str]:
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", text.strip()) if sentence]
+
+
+# must match the segmenter the project was created with
+@cache
+def get_sentence_splitter(segmenter: str = SEGMENTER) -> Callable[[str], List[str]]:
+    if segmenter == "regex":
+        return regex_split_sentences
+    try:
+        nltk.data.find("tokenizers/punkt")
+    except LookupError:
+        if not nltk.download("punkt", quiet=True, raise_on_error=False):  # offline
+            return regex_split_sentences
+    return nltk.sent_tokenize
 
 
-def vectorize(text: str, model: SentenceTransformer) -> np.array:
-    sentences = nltk.sent_tokenize(text)
+def vectorize(text: str, model: SentenceTransformer, segmenter: str = SEGMENTER) -> np.array:
+    sentences = get_sentence_splitter(segmenter)(text)
     sentences_embeddings = model.encode(sentences)
     return sentences_embeddings.mean(axis=0)
 
 
-def embed_texts(texts: list[str]) -> list[list[float]]:
-    model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-    return [vectorize(text, model).tolist() for text in tqdm(texts, desc="vectorizing texts")]
+def embed_texts(texts: list[str], encoder: SentenceTransformer, segmenter: str = SEGMENTER) -> list[list[float]]:
+    return [vectorize(text, encoder, segmenter).tolist() for text in tqdm(texts, desc="vectorizing texts")]
 
 
-def predict(model: LogisticRegression, texts: list[str]) -> list[str]:
-    vectors = embed_texts(texts)
+def predict(
+    model: LogisticRegression, encoder: SentenceTransformer, texts: list[str], segmenter: str = SEGMENTER
+) -> list[str]:
+    vectors = embed_texts(texts, encoder, segmenter)
     return model.predict(vectors).tolist()
 
 
 def main():
     model_path = "model.pkl"
     texts = ["hello world", "how are you?"]
-    model = load_model(model_path)
-    labels = predict(model, texts)
+    model, metadata = load_model(model_path)
+    encoder = load_encoder(metadata)
+    labels = predict(model, encoder, texts, metadata.get("segmenter", SEGMENTER))
     print(labels)
 
 
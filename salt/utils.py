@@ -1,4 +1,5 @@
 import pandas as pd
+from typing import Iterator, List
 
 
 def get_file_type(path: str) -> str:
@@ -13,3 +14,14 @@ def read_csv_or_jsonl(path: str) -> pd.DataFrame:
         return pd.read_json(path, lines=True)
 
     raise NotImplementedError("Only CSV and JSONL file types are supported.")
+
+
+def read_csv_or_jsonl_chunks(path: str, columns: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    file_type = get_file_type(path)
+    if file_type == "csv":
+        yield from pd.read_csv(path, usecols=columns, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    elif file_type == "jsonl":
+        for chunk in pd.read_json(path, lines=True, dtype=False, chunksize=chunk_size):
+            yield chunk[columns]
+    else:
+        raise NotImplementedError("Only CSV and JSONL file types are supported.")
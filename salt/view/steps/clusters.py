@@ -1,15 +1,24 @@
 import math
-import numpy as np
-import pandas as pd
 import streamlit as st
-from salt.logic.clusters import DistanceType
+from salt.logic.clusters import DistanceType, HIERARCHICAL, K_MEANS, NEAR_DUPLICATES
 from salt.view.utils import get_project_state
-from salt.constants import EDITED_DF_KEY, CLUSTER, TEXT, MEAN_DISTANCE
+from salt.constants import EDITED_DF_KEY
 
 CLUSTER_INDEX_KEY = "cluster_index"
+CLUSTERS_PARAMS_KEY = "clusters_params"
 
 EXPLICIT = "Explicit"
 BY_DISTANCE = "By Distance"
+SAMPLE = "Sample"
+ALL = "All"
+DUPLICATES = "Duplicates"
+TEXTS2ENGINE = {SAMPLE: HIERARCHICAL, ALL: K_MEANS, DUPLICATES: NEAR_DUPLICATES}
+ENGINE2DISTANCE_TYPES = {
+    HIERARCHICAL: [t.value for t in DistanceType],
+    K_MEANS: [DistanceType.SEMANTIC.value],
+    NEAR_DUPLICATES: [DistanceType.LEXICAL.value],
+}
+ENGINE2METHODS = {HIERARCHICAL: (EXPLICIT, BY_DISTANCE), K_MEANS: (EXPLICIT,), NEAR_DUPLICATES: (BY_DISTANCE,)}
 OVERVIEW = "🗄️ Overview"
 BY_CLUSTER = "🗃️ By Cluster"
 
@@ -27,25 +36,44 @@ def clusters_step():
         st.session_state[CLUSTER_INDEX_KEY] = 1
 
     st.sidebar.header(project.name)
+    texts = st.sidebar.radio(
+        label="Texts",
+        options=list(TEXTS2ENGINE),
+        horizontal=True,
+        help=(
+            f"**Sample**: hierarchical clustering of {clusters.get_num_examples(HIERARCHICAL):,} texts\n\n"
+            f"**All**: k-means clustering of all the {clusters.get_num_examples(K_MEANS):,} texts, by meaning\n\n"
+            "**Duplicates**: groups of near-duplicate texts (e.g. from the same template), among all the texts"
+        ),
+    )
+    engine = TEXTS2ENGINE[texts]
     distance_type = st.sidebar.radio(
         label="Similarity type",
-        options=[t.value for t in DistanceType],
+        options=ENGINE2DISTANCE_TYPES[engine],
         horizontal=True,
         help=(
             "**Lexical**: by exact phrases (to find patterns)\n\n" "**Semantic**: by similar meaning (to find topics)"
         ),
     )
 
-    method = st.sidebar.radio(label="Number of clusters", options=(EXPLICIT, BY_DISTANCE), horizontal=True)
+    num_examples = clusters.get_num_examples(engine)
+    method = st.sidebar.radio(
+        label="Number of clusters",
+        options=ENGINE2METHODS[engine],
+        horizontal=True,
+    )
     if method == EXPLICIT:
-        default_num_clusters = math.ceil(
-            clusters.num_examples / 2 if distance_type == DistanceType.LEXICAL.value else clusters.num_examples / 100
-        )
+        if engine == K_MEANS:
+            default_num_clusters = math.ceil(math.sqrt(num_examples))
+        else:
+            default_num_clusters = math.ceil(
+                num_examples / 2 if distance_type == DistanceType.LEXICAL.value else num_examples / 100
+            )
         num_clusters = st.sidebar.number_input(
             "Num clusters",
             label_visibility="collapsed",
             min_value=1,
-            max_value=clusters.num_examples,
+            max_value=num_examples,
             value=default_num_clusters,
         )
         distance_threshold = None
@@ -54,7 +82,7 @@ def clusters_step():
             "Distance threshold",
             min_value=0.0,
             max_value=1.0,
-            value=0.5,
+            value=0.2 if engine == NEAR_DUPLICATES else 0.5,
             step=0.05,
             help=(
                 "The maximum allowed distance between two items in a cluster.\n\n"
@@ -64,31 +92,21 @@ def clusters_step():
         )
         num_clusters = None
 
-    if st.sidebar.button("Run clustering"):
+    # once the merge tree is built, the clusters follow the sidebar without rerunning
+    params = (engine, distance_type, num_clusters, distance_threshold)
+    is_instant = engine == HIERARCHICAL and clusters.has_tree(DistanceType(distance_type))
+    if st.sidebar.button("Run clustering") or (is_instant and params != st.session_state.get(CLUSTERS_PARAMS_KEY)):
+        st.session_state[CLUSTERS_PARAMS_KEY] = params
         with st.spinner("Building clusters..."):
             clusters.run(
                 num_clusters=num_clusters,
                 distance_threshold=distance_threshold,
                 distance_type=DistanceType(distance_type),
+                engine=engine,
             )
             project.update_clusters(clusters.df)
         st.session_state[CLUSTER_INDEX_KEY] = 1
 
-    df_all = (
-        clusters.get_data()
-        .groupby(CLUSTER)
-        .agg(
-            cluster=pd.NamedAgg(column=CLUSTER, aggfunc=lambda ids: ids.iloc[0]),
-            example=pd.NamedAgg(column=TEXT, aggfunc=lambda texts: texts.iloc[0]),
-            size=pd.NamedAgg(column=TEXT, aggfunc="count"),
-            cohesion=pd.NamedAgg(
-                column=MEAN_DISTANCE,
-                aggfunc=lambda distances: round(1 - np.mean(distances), 2),
-            ),
-        )
-        .set_index("cluster", drop=True)
-    )
-
     view_mode = st.radio(
         "View mode",
         options=[OVERVIEW, BY_CLUSTER],
@@ -96,7 +114,7 @@ def clusters_step():
         horizontal=True,
     )
     if view_mode == OVERVIEW:
-        st.dataframe(df_all, use_container_width=True)
+        st.dataframe(clusters.overview, use_container_width=True)
     else:  # view_mode == BY_CLUSTER
         col1, col2, _ = st.columns([0.7, 1.4, 3])
         with col1:
@@ -116,7 +134,14 @@ def clusters_step():
         )
     st.sidebar.download_button(
         "Download",
-        clusters.get_data().to_csv(index=False),
+        clusters.get_csv(),
         f"{project.name}_clusters-{clusters.distance_type.value.lower()}-{clusters.num_clusters}.csv",
         "text/csv",
     )
+    if clusters.engine == NEAR_DUPLICATES:
+        st.sidebar.download_button(
+            "Download duplicates report",
+            clusters.get_duplicates_report_csv(),
+            f"{project.name}_duplicates.csv",
+            "text/csv",
+        )
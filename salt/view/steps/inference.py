@@ -3,8 +3,8 @@ import pickle
 import pandas as pd
 import streamlit as st
 from pathlib import Path
-from salt.constants import VECTOR, TEXT
-from salt.logic.embeddings import embed_texts
+from salt.constants import TEXT
+from salt.logic.embeddings import embed_texts, METADATA_KEY
 from salt.view.file_selector import file_selector
 from salt.logic.classifier import SingleLabelClassifier
 from salt.view.utils import get_project_state_if_has_classes
@@ -15,7 +15,9 @@ CODE = "🧑🏻‍💻 From code"
 
 INFER_FILE_KEY = "infer_file"
 INFER_COL_KEY = "infer_col"
+INFER_VECTORS_KEY = "infer_vectors"
 PROJECT_NAME_KEY = "project_name"
+MODEL_KEY = "model"
 
 
 def get_filename(filepath: str) -> str:
@@ -44,7 +46,8 @@ def inference_step():
 
         project.al.fit()
         classifier: SingleLabelClassifier = project.al.model
-        st.download_button("Export model", data=pickle.dumps(classifier.model), file_name="model.pkl")
+        exported_model = {MODEL_KEY: classifier.model, METADATA_KEY: project.metadata}
+        st.download_button("Export model", data=pickle.dumps(exported_model), file_name="model.pkl")
         script_path = Path(__file__).parents[2].joinpath("resources/thin_classifier.py")
         with st.expander("Show code sample"):
             st.code(script_path.read_text(), language="python")
@@ -54,7 +57,8 @@ def inference_step():
         text = st.text_input("Insert text", label_visibility="collapsed")
         if not text:
             return
-        df = pd.DataFrame({TEXT: [text], VECTOR: embed_texts([text])})
+        df = pd.DataFrame({TEXT: [text]})
+        vectors = embed_texts([text], project.encoding_params)
         filepath = "single"
         submitted = True
 
@@ -65,12 +69,13 @@ def inference_step():
             if file_data is None:
                 return
             df, filepath = file_data
+            vectors = st.session_state[INFER_VECTORS_KEY]
             with st.form("existing_infer_file"):
                 col1, col2 = st.columns([3, 1])
                 col1.markdown(f"**File**: {get_filename(filepath)} , **Column**: {st.session_state[INFER_COL_KEY]}")
                 submitted = col2.form_submit_button("Update predictions")
             if not submitted:
-                st.dataframe(df.drop(columns={VECTOR}))
+                st.dataframe(df)
         else:
             df, filepath = file_data
             with st.form("new_infer_file"):
@@ -83,8 +88,9 @@ def inference_step():
                 )
                 submitted = col3.form_submit_button("Predict")
                 if submitted:
-                    df[VECTOR] = embed_texts(df[column].to_list())
+                    vectors = embed_texts(df[column].to_list(), project.encoding_params)
                     st.session_state[INFER_FILE_KEY] = file_data
+                    st.session_state[INFER_VECTORS_KEY] = vectors
                     st.session_state[INFER_COL_KEY] = column
                 else:
                     return
@@ -92,13 +98,13 @@ def inference_step():
     if submitted:
         with st.spinner("Running..."):
             project.al.fit()
-            project.al.predict_and_update(df)
+            project.al.predict_and_update(df, vectors)
         st.session_state[PROJECT_NAME_KEY] = project.name
-        st.dataframe(df.drop(columns={VECTOR}))
+        st.dataframe(df)
 
     st.download_button(
         "Download",
-        df.drop(columns={VECTOR}).to_csv(index=False),
+        df.to_csv(index=False),
         f"{st.session_state[PROJECT_NAME_KEY]}_inference_{get_filename_wo_extension(filepath)}.csv",
         "text/csv",
     )
@@ -2,8 +2,16 @@ import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
 from salt.logic.utils import get_str_from_labels
+from salt.logic.active_learning import ActiveLearningMechanism
 from salt.constants import DUMP_INTERVAL, EDITED_DF_KEY, SKIP
 from salt.view.utils import get_project_state_if_has_classes, get_counts_df
+from salt.logic.batch_selection import DIVERSITY_METHODS
+from salt.logic.query_strategies import get_query_strategies, get_query_strategy_name
+
+
+def get_model_status(al: ActiveLearningMechanism) -> str:
+    retraining = " (retraining...)" if al.is_updating else ""
+    return f"Labels since the last fit: {al.num_anns - al.model_num_anns}{retraining}  \nQueued texts: {len(al.queue)}"
 
 
 def labeling_step():
@@ -16,11 +24,47 @@ def labeling_step():
 
     st_text = st.empty()
     al = project.al
+    al.uncertainty_index.rescore_interval = st.sidebar.number_input(
+        "Full rescoring interval",
+        min_value=1,
+        value=al.uncertainty_index.rescore_interval,
+        help="Re-score all the unlabeled texts once every this number of labels (in between, only the most uncertain)",
+    )
+    al.batch_size = st.sidebar.number_input(
+        "Batch size",
+        min_value=1,
+        value=al.batch_size,
+        help="Number of texts to annotate between model updates",
+    )
+    al.diversity_method = st.sidebar.selectbox(
+        "Batch diversity",
+        options=list(DIVERSITY_METHODS),
+        index=list(DIVERSITY_METHODS).index(al.diversity_method),
+        help="**k-center**: spread each batch over the embedding space, instead of taking the most uncertain texts",
+    )
+    query_strategies = get_query_strategies(al.is_multilabel)
+    query_strategy = get_query_strategy_name(al.query_strategy, al.is_multilabel)
+    selected_query_strategy = st.sidebar.selectbox(
+        "Query strategy",
+        options=query_strategies,
+        index=query_strategies.index(query_strategy),
+        help="How the uncertainty of the model in a text is measured, to pick the most uncertain texts",
+    )
+    if selected_query_strategy != query_strategy:  # otherwise, keep following the default of the mode
+        project.set_query_strategy(selected_query_strategy)
+    al.background = st.sidebar.checkbox(
+        "Train in background",
+        value=al.background,
+        disabled=al.executor is None,
+        help="Serve the next texts by the latest trained model while the model is updated",
+    )
+    st_status = st.sidebar.empty()
     if al.all_labeled:
         st.info("All texts are labeled!")
         return
 
     st_text.text_area(label="example to annotate", value=al.next_example, label_visibility="collapsed")
+    st_status.caption(get_model_status(al))
 
     labels = al.get_ann_options()
 
@@ -51,10 +95,11 @@ def labeling_step():
             value=al.next_example,
             label_visibility="collapsed",
         )
+        st_status.caption(get_model_status(al))
 
         st.markdown("")
         st.markdown("###### Class Distribution")
-        st.dataframe(get_counts_df(al.df).T)
+        st.dataframe(get_counts_df().T)
 
         if al.num_anns % DUMP_INTERVAL == 0:
             with st.spinner("Auto-save..."):
@@ -1,9 +1,8 @@
 import pandas as pd
 import streamlit as st
-from salt.logic.utils import get_prob_col
 from salt.logic.project import SaltProject
 from salt.logic.filter import FilterParams
-from salt.view.utils import get_project_state, get_counts_df
+from salt.view.utils import get_project_state, get_project_state_if_has_classes, get_counts_df
 from salt.constants import NA, SKIP, LABEL, PRED, CLUSTER, EDITED_DF_KEY, ALL
 
 FILTER_PARAMS_KEY = "filter_params"
@@ -54,7 +53,7 @@ def review_step():
         st.markdown("Prediction")
         st.markdown("###")
     with col4:
-        valid_pred_labels = [label for label in al.labels if get_prob_col(label) in project.df.columns]
+        valid_pred_labels = [label for label in al.labels if label in project.label_store.pred_classes]
         filter_params[PRED_FILTER_KEY] = st.selectbox(
             label=PRED, options=[ALL] + valid_pred_labels, label_visibility="collapsed"
         )
@@ -105,6 +104,16 @@ def review_step():
     )
     st.sidebar.dataframe(get_counts_df(edited_df))
 
+    if al.predictions_num_anns is not None:
+        st.sidebar.caption(f"Predictions are {al.num_anns - al.predictions_num_anns} labels old")
+    if st.sidebar.button("Update predictions", help="Predict all the texts with the latest model"):
+        if get_project_state_if_has_classes():
+            with st.spinner("Predicting..."):
+                al.fit()
+                al.update_predictions()
+            st.session_state.pop(EDITED_DF_KEY)
+            st.rerun()
+
     col3, col4 = st.sidebar.columns([1, 2])
     with col3:
         if st.button("Backup"):
@@ -2,9 +2,14 @@ import re
 import streamlit as st
 from pathlib import Path
 from typing import Optional
-from salt.logic.project import SaltProject
+from salt.logic.ingest import is_incomplete
+from salt.logic.project import SaltProject, get_working_dir
+from salt.logic.embeddings import EncodingParams
+from salt.logic.encoders import ENCODER_BACKENDS, DEFAULT_ENCODER_BACKEND
+from salt.logic.segmentation import SEGMENTERS, DEFAULT_SEGMENTER
 from salt.view.file_selector import file_selector
-from salt.constants import PROJECTS_DIR, PROJECT_STATE_KEY, EDITED_DF_KEY
+from salt.view.utils import set_project_state
+from salt.constants import PROJECTS_DIR, EDITED_DF_KEY
 
 PROJECT_LIST_KEY = "project_list"
 
@@ -22,7 +27,7 @@ def find_project_name_problems(name: str) -> Optional[str]:
     invalid_char = re.search(r"[^\w_-]", name)
     if invalid_char:
         return f"Project name cannot contain the character '{invalid_char.group()}'"
-    if name in st.session_state[PROJECT_LIST_KEY]:
+    if name in st.session_state[PROJECT_LIST_KEY] and not is_incomplete(get_working_dir(name)):
         return "Project name already exists."
     return None
 
@@ -36,7 +41,9 @@ def setup_step():
             projects_dir = Path(PROJECTS_DIR)
             projects_dir.mkdir(parents=True, exist_ok=True)
 
-            st.session_state[PROJECT_LIST_KEY] = sorted([p.name for p in projects_dir.iterdir() if p.is_dir()])
+            st.session_state[PROJECT_LIST_KEY] = sorted(
+                [p.name for p in projects_dir.iterdir() if p.is_dir() and not p.name.startswith(".")]
+            )
 
     create_or_load = st.radio(
         label="Create a new project or load an existing one",
@@ -48,7 +55,7 @@ def setup_step():
         selected_project = st.selectbox(label="Select project", options=st.session_state[PROJECT_LIST_KEY])
         if st.button("Load project"):
             with st.spinner("Loading project..."):
-                st.session_state[PROJECT_STATE_KEY] = SaltProject.load(selected_project)
+                set_project_state(SaltProject.load(selected_project))
             st.write("Project loaded successfully! To proceed, click on one of the steps above.")
         return
 
@@ -85,13 +92,50 @@ def setup_step():
                 options=[None] + st.session_state[PROJECT_LIST_KEY],
             )
 
+            col10, col11 = st.columns([1, 5])
+            col10.markdown("Processes")
+            num_workers = col11.number_input(
+                label="num_workers",
+                label_visibility="collapsed",
+                min_value=0,
+                value=1,
+                help="Number of processes for embedding the texts (0: one per CPU core)",
+            )
+
+            col12, col13 = st.columns([1, 5])
+            col12.markdown("Encoder")
+            backend = col13.selectbox(
+                label="encoder_backend",
+                label_visibility="collapsed",
+                options=list(ENCODER_BACKENDS),
+                index=list(ENCODER_BACKENDS).index(DEFAULT_ENCODER_BACKEND),
+                help="**torch-int8**: a dynamically quantized encoder, faster on CPU-only machines",
+            )
+
+            col14, col15 = st.columns([1, 5])
+            col14.markdown("Sentence splitter")
+            segmenter = col15.selectbox(
+                label="segmenter",
+                label_visibility="collapsed",
+                options=list(SEGMENTERS),
+                index=list(SEGMENTERS).index(DEFAULT_SEGMENTER),
+                help="**regex**: splits after sentence-ending punctuation, much faster but less accurate than punkt",
+            )
+
     if submitted:
         name_problem = find_project_name_problems(project_name)
         if name_problem:
             st.error(name_problem)
             return
         with st.spinner("Creating project..."):
-            st.session_state[PROJECT_STATE_KEY] = SaltProject.create(
-                df, text_column, label_column, project_name, base_project_name
+            set_project_state(
+                SaltProject.create(
+                    df,
+                    text_column,
+                    label_column,
+                    project_name,
+                    base_project_name,
+                    EncodingParams(num_workers=num_workers, backend=backend, segmenter=segmenter),
+                )
             )
         st.write("Project created successfully! To proceed, click on one of the steps above.")
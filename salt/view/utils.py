@@ -1,11 +1,8 @@
 import pandas as pd
 import streamlit as st
 from typing import Optional
-from itertools import chain
-from collections import Counter
 from salt.logic.project import SaltProject
 from salt.constants import PROJECT_STATE_KEY, LABEL, PRED, NA, ALL
-from salt.logic.utils import get_labels_from_str
 
 
 def get_project_state() -> Optional[SaltProject]:
@@ -16,15 +13,21 @@ def get_project_state() -> Optional[SaltProject]:
     return st.session_state[PROJECT_STATE_KEY]
 
 
+def set_project_state(project: SaltProject) -> None:
+    previous_project = st.session_state.get(PROJECT_STATE_KEY)
+    if previous_project is not None and previous_project is not project:
+        previous_project.close()
+    st.session_state[PROJECT_STATE_KEY] = project
+
+
 def get_project_state_if_has_classes() -> Optional[SaltProject]:
     project = get_project_state()
     if not project:
         return
     al = project.al
     if al.is_multilabel:
-        annotations = al.get_train_df()[LABEL]
         for label in project.al.labels:
-            if not al.is_multi_label_class_fittable(label, annotations):
+            if not al.is_multi_label_class_fittable(label):
                 st.error(f'Please add at least 1 negative example for the class "{label}".')
                 return
     elif not al.is_single_label_fittable:
@@ -33,10 +36,15 @@ def get_project_state_if_has_classes() -> Optional[SaltProject]:
     return project
 
 
-def get_counts_df(df: pd.DataFrame) -> pd.DataFrame:
-    labels = get_project_state().al.get_ann_options() + [NA]
-    col2values = {}
-    for col in [LABEL, PRED]:
-        counter = Counter(chain.from_iterable(df[col].apply(get_labels_from_str)))
-        col2values[col] = [counter[label] for label in labels] + [len(df)]
+def get_counts_df(df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """The labels and predictions counts of the given rows (with their labels as edited), or of the whole project."""
+    project = get_project_state()
+    label_store = project.label_store
+    if df is not None:
+        label_store = label_store.get_subset(df.index.to_numpy(), df[LABEL].to_numpy())
+    labels = project.al.get_ann_options() + [NA]
+    col2values = {
+        LABEL: [label_store.count_gold(label) for label in labels] + [label_store.num_rows],
+        PRED: [label_store.count_preds(label) for label in labels] + [label_store.num_rows],
+    }
     return pd.DataFrame(col2values, index=labels + [ALL])
@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+from salt.constants import NA, SKIP, TEXT, LABEL, DATE
+from salt.logic.label_store import LabelStore
+from salt.logic.active_learning import ActiveLearningMechanism
+
+
+def create_mechanism(labels_strs) -> ActiveLearningMechanism:
+    df = pd.DataFrame({TEXT: [str(i) for i in range(len(labels_strs))], LABEL: labels_strs, DATE: pd.NaT})
+    vectors = np.random.default_rng(0).normal(size=(len(labels_strs), 4)).astype(np.float32)
+    return ActiveLearningMechanism(df, vectors, LabelStore.from_strs(labels_strs))
+
+
+def test_set_labels_ignores_unchanged_labels():
+    al = create_mechanism(["A", NA, "B", NA])
+    edited = pd.DataFrame({LABEL: ["B,A", SKIP, "B"]}, index=[0, 1, 2])
+    al.set_labels(edited)
+    assert al.num_label_changes == 1
+    assert al.label_store.get_gold_strs().tolist() == ["A,B", SKIP, "B", NA]
+    dates = al.df[DATE].copy()
+
+    al.set_labels(edited)  # a rerun with the same edits, as typed
+    assert al.num_label_changes == 1
+    pd.testing.assert_series_equal(al.df[DATE], dates)
+    assert pd.isna(dates[2])  # unchanged rows keep their date
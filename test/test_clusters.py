@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from salt.logic.clusters import cut_tree_by_count, save_array
+
+
+@pytest.fixture(scope="module")
+def vectors() -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(300, 32))
+
+
+@pytest.mark.parametrize("num_clusters", [1, 2, 7, 50, 299, 300])
+def test_cut_tree_by_count_as_agglomerative_clustering(vectors, num_clusters):
+    from scipy.cluster.hierarchy import linkage
+    from scipy.spatial.distance import pdist
+    from sklearn.cluster import AgglomerativeClustering
+    from sklearn.metrics import adjusted_rand_score
+
+    clusters = cut_tree_by_count(linkage(pdist(vectors, "cosine"), method="complete"), num_clusters)
+    expected = AgglomerativeClustering(num_clusters, metric="cosine", linkage="complete").fit_predict(vectors)
+    assert len(np.unique(clusters)) == num_clusters
+    assert adjusted_rand_score(expected, clusters) == 1.0
+
+
+def test_cut_tree_by_count_with_tied_merges():
+    from scipy.cluster.hierarchy import linkage
+
+    distances = np.ones(10 * 9 // 2)  # e.g. the lexical distances of texts without common words
+    clusters = cut_tree_by_count(linkage(distances, method="complete"), 4)
+    assert len(np.unique(clusters)) == 4
+
+
+def test_save_array_removes_the_other_keys_of_its_name(tmp_path):
+    for file_name in ["lexical_old.npy", "lexical_tree_old.npy", "lexical_other.tmp.npy"]:
+        np.save(tmp_path / file_name, np.zeros(1))
+    save_array(tmp_path / "lexical_new.npy", np.ones(1))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [
+        "lexical_new.npy",
+        "lexical_other.tmp.npy",
+        "lexical_tree_old.npy",
+    ]
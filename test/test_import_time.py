@@ -0,0 +1,22 @@
+import pytest
+from pathlib import Path
+from benchmarks.import_time import IMPORT_TIME_BUDGETS, LAZY_MODULES, measure_import, check_import
+
+ROOT_DIR = Path(__file__).parent.parent
+REPEATS = 3
+
+
+@pytest.fixture(autouse=True)
+def root_dir(monkeypatch):
+    monkeypatch.chdir(ROOT_DIR)  # the measuring interpreters import salt from the working directory
+
+
+@pytest.mark.parametrize("module", list(IMPORT_TIME_BUDGETS))
+def test_lazy_modules_are_not_imported(module):
+    loaded = {name.split(".")[0] for name in measure_import(module)["modules"]}
+    assert not loaded.intersection(LAZY_MODULES)
+
+
+@pytest.mark.parametrize("module, budget", list(IMPORT_TIME_BUDGETS.items()))
+def test_import_time_budget(module, budget):
+    assert check_import(module, budget, REPEATS)
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+import pytest
+from functools import partial
+from typing import List
+import salt.logic.ingest as ingest_module
+import salt.logic.embeddings as embeddings_module
+import salt.logic.segmentation as segmentation_module
+from salt.logic.segmentation import REGEX
+from salt.logic.encoders import Encoder, register_encoder
+from salt.logic.embedding_cache import EmbeddingCache, get_sentences_hashes
+from salt.logic.embeddings import EncodingParams, TEXTS_KEY, VECTORS_KEY
+from salt.logic.ingest import ingest_dataframe, is_incomplete
+from salt.logic.vector_store import load_vector_store
+
+DUMMY = "test-dummy"
+DIM = 8
+CHUNK_SIZE = 4
+
+
+@register_encoder(DUMMY)
+class DummyEncoder(Encoder):
+    """Deterministic vectors derived from the sentences' hashes."""
+
+    def encode(self, sentences: List[str], batch_size: int) -> np.ndarray:
+        hashes = get_sentences_hashes(sentences)
+        return np.stack([np.random.default_rng(int(h)).normal(size=DIM) for h in hashes]).astype(np.float32)
+
+    def get_tokens_lengths(self, sentences: List[str]) -> np.ndarray:
+        return np.array([len(sentence.split()) for sentence in sentences])
+
+
+@pytest.fixture
+def params(tmp_path, monkeypatch) -> EncodingParams:
+    monkeypatch.setattr(embeddings_module, "EmbeddingCache", partial(EmbeddingCache, cache_dir=tmp_path / "embeddings"))
+    monkeypatch.setattr(
+        segmentation_module,
+        "SegmentationCache",
+        partial(segmentation_module.SegmentationCache, cache_dir=tmp_path / "sentences"),
+    )
+    return EncodingParams(model_name="dummy", backend=DUMMY, segmenter=REGEX)
+
+
+def create_df(num_texts: int = 14) -> pd.DataFrame:
+    texts = [f"Text number {i}. It has {i % 3} sentences!" for i in range(num_texts)]
+    return pd.DataFrame({"text": texts + texts[:2] + [" "], "label": [str(i % 2) for i in range(num_texts + 3)]})
+
+
+def test_resume_after_crash(tmp_path, monkeypatch, params):
+    df = create_df()
+    ingest_dataframe(df, "text", "label", str(tmp_path / "uninterrupted"), params, CHUNK_SIZE)
+    expected = load_vector_store(str(tmp_path / "uninterrupted"))
+
+    dir_path = str(tmp_path / "interrupted")
+    embed_texts = embeddings_module.embed_texts
+    num_calls = []
+
+    def crash_on_third_chunk(*args, **kwargs):
+        num_calls.append(1)
+        if len(num_calls) == 3:
+            raise KeyboardInterrupt()
+        return embed_texts(*args, **kwargs)
+
+    monkeypatch.setattr(ingest_module, "embed_texts", crash_on_third_chunk)
+    with pytest.raises(KeyboardInterrupt):
+        ingest_dataframe(df, "text", "label", dir_path, params, CHUNK_SIZE)
+    assert is_incomplete(dir_path)
+
+    resumed_calls = []
+    monkeypatch.setattr(ingest_module, "embed_texts", lambda *args: resumed_calls.append(1) or embed_texts(*args))
+    ingest_dataframe(df, "text", "label", dir_path, params, CHUNK_SIZE)
+    resumed = load_vector_store(dir_path)
+
+    assert not is_incomplete(dir_path)
+    assert len(resumed_calls) == 2  # the chunks after the checkpoint, but the last one (a single empty text)
+    assert list(resumed[TEXTS_KEY]) == list(expected[TEXTS_KEY]) == df["text"].iloc[:14].to_list()
+    np.testing.assert_array_equal(np.asarray(resumed[VECTORS_KEY]), np.asarray(expected[VECTORS_KEY]))
+
+
+@pytest.mark.parametrize("crashing", ["dump_metadata", "rmtree"])
+def test_rerun_after_crash_while_finalizing(tmp_path, monkeypatch, params, crashing):
+    df = create_df()
+    ingest_dataframe(df, "text", "label", str(tmp_path / "uninterrupted"), params, CHUNK_SIZE)
+    expected = load_vector_store(str(tmp_path / "uninterrupted"))
+
+    dir_path = str(tmp_path / "interrupted")
+    dump_metadata, rmtree = ingest_module.dump_metadata, ingest_module.shutil.rmtree
+
+    def crash_after(function, *args, **kwargs):
+        function(*args, **kwargs)
+        if not kwargs.get("ignore_errors"):  # not the cleanup of a fresh ingestion
+            raise KeyboardInterrupt()
+
+    if crashing == "dump_metadata":
+        monkeypatch.setattr(ingest_module, "dump_metadata", partial(crash_after, dump_metadata))
+    else:
+        monkeypatch.setattr(ingest_module.shutil, "rmtree", partial(crash_after, rmtree))
+    with pytest.raises(KeyboardInterrupt):
+        ingest_dataframe(df, "text", "label", dir_path, params, CHUNK_SIZE)
+    monkeypatch.setattr(ingest_module, "dump_metadata", dump_metadata)
+    monkeypatch.setattr(ingest_module.shutil, "rmtree", rmtree)
+
+    for _ in range(2):  # as left by the crash, then after re-running the ingestion
+        if not is_incomplete(dir_path):
+            rerun = load_vector_store(dir_path)
+            assert list(rerun[TEXTS_KEY]) == list(expected[TEXTS_KEY])
+            np.testing.assert_array_equal(np.asarray(rerun[VECTORS_KEY]), np.asarray(expected[VECTORS_KEY]))
+        ingest_dataframe(df, "text", "label", dir_path, params, CHUNK_SIZE)
+    assert not is_incomplete(dir_path)
@@ -0,0 +1,85 @@
+import numpy as np
+from salt.constants import NA, SKIP
+from salt.logic.label_store import LabelStore, UNLABELED, LABELED, SKIPPED
+
+LABELS_STRS = ["A", "B,A", NA, SKIP, "C", "A,B", NA]
+
+
+def test_from_strs():
+    store = LabelStore.from_strs(LABELS_STRS)
+    assert store.classes == ["A", "B", "C"]
+    assert store.status.tolist() == [LABELED, LABELED, UNLABELED, SKIPPED, LABELED, LABELED, UNLABELED]
+    assert store.gold[:, store.class2index["A"]].tolist() == [True, True, False, False, False, True, False]
+    assert store.get_gold_strs().tolist() == ["A", "A,B", NA, SKIP, "C", "A,B", NA]
+    assert store.get_gold_strs(np.array([4, 1])).tolist() == ["C", "A,B"]
+    assert store.train_indices.tolist() == [0, 1, 4, 5]
+    assert store.is_multilabel
+
+
+def test_set_gold_adds_classes_and_clears_labels():
+    store = LabelStore.from_strs(LABELS_STRS)
+    store.set_gold(np.array([0, 2, 4]), [NA, "D,B", SKIP])
+    assert store.classes == ["A", "B", "C", "D"]
+    assert store.get_gold_strs().tolist() == [NA, "A,B", "B,D", SKIP, SKIP, "A,B", NA]
+    assert not store.gold[[0, 4]].any()
+    assert store.gold_classes == ["A", "B", "D"]  # C has no labeled row left
+
+
+def test_set_predictions():
+    store = LabelStore.from_strs(LABELS_STRS)
+    probs = np.array([[0.9, 0.2], [0.1, 0.3], [0.6, 0.7], [0.2, 0.1], [0.4, 0.8], [0.7, 0.6], [0.3, 0.4]])
+    store.set_predictions(["A", "E"], probs > 0.5, probs.astype(np.float32))
+    assert store.classes == ["A", "B", "C", "E"]
+    assert store.pred_classes == ["A", "E"]
+    assert store.get_pred_strs().tolist() == ["A", NA, "A,E", NA, "E", "A,E", NA]
+    np.testing.assert_allclose(store.get_probs("E"), probs[:, 1])
+    assert np.isnan(store.get_probs("B")).all()
+
+
+def test_snapshot():
+    store = LabelStore.from_strs(LABELS_STRS)
+    store.set_gold(np.array([4]), [NA])
+    snapshot = store.get_snapshot()
+    assert snapshot.classes == ["A", "B"]
+    assert snapshot.train_indices.tolist() == [0, 1, 5]
+    assert snapshot.train_matrix.tolist() == [[True, False], [True, True], [True, True]]
+    store.set_gold(np.array([2]), ["A"])
+    assert snapshot.status[2] == UNLABELED  # a copy, safe to fit on in the background
+
+
+def test_subset():
+    store = LabelStore.from_strs(LABELS_STRS)
+    probs = np.linspace(0, 1, len(LABELS_STRS), dtype=np.float32)[:, None]
+    store.set_predictions(["B"], probs > 0.5, probs)
+    subset = store.get_subset(np.array([5, 0, 3]))
+    assert subset.get_gold_strs().tolist() == ["A,B", "A", SKIP]
+    assert subset.get_pred_strs().tolist() == ["B", NA, NA]
+    relabeled = store.get_subset(np.array([5, 0]), ["C", NA])
+    assert relabeled.get_gold_strs().tolist() == ["C", NA]
+
+
+def test_stats_match_a_recount():
+    rng = np.random.default_rng(0)
+    options = np.array([NA, SKIP, "A", "B", "C", "A,B", "B,C", "A,B,C"], dtype=object)
+    store = LabelStore.from_strs(rng.choice(options, 200))
+    for _ in range(50):
+        indices = rng.choice(200, rng.integers(1, 20), replace=False)
+        store.set_gold(indices, rng.choice(options, len(indices)))
+        probs = rng.random((200, 2)).astype(np.float32)
+        store.set_predictions(["A", "D"], probs > 0.7, probs)
+
+    strs = store.get_gold_strs()
+    assert store.count_gold(NA) == np.count_nonzero(strs == NA)
+    assert store.count_gold(SKIP) == np.count_nonzero(strs == SKIP)
+    assert store.num_annotated == np.count_nonzero(strs != NA)
+    for label in ["A", "B", "C", "D"]:
+        num_gold = sum(label in s.split(",") for s in strs if s not in [NA, SKIP])
+        assert store.count_gold(label) == num_gold
+        assert store.count_negatives(label) == np.count_nonzero(store.status == LABELED) - num_gold
+    assert store.count_gold("unknown") == 0
+    assert store.is_multilabel == any("," in s for s in strs)
+
+    pred_strs = store.get_pred_strs()
+    assert store.count_preds(NA) == np.count_nonzero(pred_strs == NA)
+    assert store.count_preds("D") == sum("D" in s.split(",") for s in pred_strs)
+    assert store.count_preds("B") == 0
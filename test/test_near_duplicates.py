@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+from salt.constants import TEXT, CLUSTER
+from salt.logic.near_duplicates import (
+    GROUP_SIZE,
+    MIN_RECALL,
+    get_minhash_signatures,
+    get_lsh_bands,
+    find_near_duplicates,
+    get_duplicates_report,
+)
+
+
+def create_texts(seed: int = 0):
+    """Unrelated random texts, and variants of a few templates with a single word changed."""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"word{i}" for i in range(5_000)])
+    templates = rng.choice(vocabulary, (3, 30))
+    variants = []
+    for template in np.repeat(templates, 5, axis=0):
+        variant = template.copy()
+        variant[rng.integers(len(variant))] = rng.choice(vocabulary)
+        variants.append(" ".join(variant))
+    unrelated = [" ".join(words) for words in rng.choice(vocabulary, (200, 30))]
+    return variants + unrelated
+
+
+def test_lsh_bands_reach_the_recall():
+    for jaccard in [0.3, 0.6, 0.9]:
+        bands, rows = get_lsh_bands(64, jaccard)
+        assert bands * rows <= 64
+        assert 1 - (1 - jaccard**rows) ** bands >= MIN_RECALL
+
+
+def test_find_near_duplicates():
+    texts = create_texts() + ["", "  "]
+    signatures, num_shingles = get_minhash_signatures(texts)
+    groups, distances = find_near_duplicates(signatures, num_shingles, distance_threshold=0.3)
+
+    for template in range(3):  # the variants of each template, and nothing else
+        variants = np.arange(template * 5, (template + 1) * 5)
+        assert len(np.unique(groups[variants])) == 1
+        assert np.count_nonzero(groups == groups[variants[0]]) == 5
+    assert len(np.unique(groups[15:])) == len(texts) - 15  # including the texts without words
+    assert distances[[0, 5, 10]].tolist() == [0, 0, 0]  # the first text of each group
+    assert (distances[1:5] > 0).all() and (distances < 0.3).all()
+
+
+def test_duplicates_report():
+    df = pd.DataFrame({TEXT: list("abcdef"), CLUSTER: [2, 1, 2, 3, 1, 1]})
+    report = get_duplicates_report(df)
+    assert report[TEXT].tolist() == ["b", "e", "f", "a", "c"]
+    assert report[GROUP_SIZE].tolist() == [3, 3, 3, 2, 2]
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from salt.logic.one_vs_rest import fit_one_vs_rest
+from salt.logic.classifier import create_classifier, PER_CLASS, BATCHED
+
+# both engines stop once their gradients are below 1e-4, but scikit-learn's lbfgs measures them on its own scale:
+# the coefficients agree up to this absolute tolerance on these well-conditioned problems, not to 1e-4
+COEF_TOLERANCE = 1e-2
+PROBS_TOLERANCE = 1e-2
+MIN_AGREEMENT = 0.99
+
+
+def create_problem(seed: int, num_rows: int = 400, dim: int = 16, num_classes: int = 4):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(num_rows, dim)).astype(np.float32)
+    labels_matrix = vectors @ rng.normal(size=(dim, num_classes)) + 2 * rng.normal(size=(num_rows, num_classes)) > 1
+    return vectors, labels_matrix, [f"class{i}" for i in range(num_classes)]
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batched_engine_agrees_with_per_class_engine(seed):
+    vectors, labels_matrix, classes = create_problem(seed)
+    per_class, batched = create_classifier(True, PER_CLASS), create_classifier(True, BATCHED)
+    per_class.fit(vectors, labels_matrix, classes)
+    batched.fit(vectors, labels_matrix, classes)
+
+    estimators = per_class.model.estimators_
+    per_class_coef = np.array([np.append(estimator.coef_, estimator.intercept_) for estimator in estimators]).T
+    np.testing.assert_allclose(batched.coef, per_class_coef, atol=COEF_TOLERANCE)
+
+    per_class_probs, batched_probs = per_class.predict_probs(vectors), batched.predict_probs(vectors)
+    np.testing.assert_allclose(batched_probs, per_class_probs, atol=PROBS_TOLERANCE)
+    agreement = (batched.get_labels_matrix(batched_probs) == per_class.get_labels_matrix(per_class_probs)).mean()
+    assert agreement >= MIN_AGREEMENT
+
+
+def test_warm_start_from_the_solution_stays_there():
+    vectors, labels_matrix, _ = create_problem(0)
+    coef = fit_one_vs_rest(vectors, labels_matrix)
+    np.testing.assert_allclose(fit_one_vs_rest(vectors, labels_matrix, coef), coef, atol=1e-3)
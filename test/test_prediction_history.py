@@ -0,0 +1,36 @@
+import numpy as np
+from salt.logic.prediction_history import PredictionHistory, count_bits
+
+
+def test_count_bits():
+    rng = np.random.default_rng(0)
+    bits = rng.random((37, 5)) > 0.3
+    np.testing.assert_array_equal(count_bits(np.packbits(bits, axis=0)), bits.sum(axis=0))
+
+
+def test_change_rates_against_the_predictions_pushed_length_ago():
+    rng = np.random.default_rng(0)
+    length, num_rows = 3, 50
+    history = PredictionHistory(length)
+    pushed = []
+    for step in range(10):
+        num_classes = 2 if step < 5 else 3  # a new class from the 6th predictions on
+        preds = rng.random((num_rows, num_classes)) > 0.6
+        change_rates = history.push(preds)
+        pushed.append(preds)
+
+        if step < length:
+            assert change_rates is None
+            continue
+        oldest = np.pad(pushed[step - length], ((0, 0), (0, num_classes - pushed[step - length].shape[1])))
+        flipped = (oldest ^ preds).sum(axis=0)
+        predicted = (oldest | preds).sum(axis=0)
+        np.testing.assert_allclose(change_rates, flipped / predicted)
+
+
+def test_change_rate_of_a_class_never_predicted_is_nan():
+    history = PredictionHistory(1)
+    history.push(np.zeros((4, 2), dtype=bool))
+    change_rates = history.push(np.array([[True, False], [False, False], [True, False], [True, False]]))
+    assert change_rates[0] == 1
+    assert np.isnan(change_rates[1])
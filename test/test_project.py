@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+import salt.logic.project as project_module
+from salt.constants import NA
+from salt.logic.project import SaltProject, get_working_dir
+from salt.logic.embeddings import get_embeddings_dict
+from salt.logic.vector_store import dump_vector_store
+from salt.logic.query_strategies import ENTROPY
+
+
+@pytest.fixture
+def project_name(tmp_path, monkeypatch) -> str:
+    monkeypatch.setattr(project_module, "PROJECTS_DIR", str(tmp_path))
+    texts = [f"text {i}" for i in range(20)]
+    labels = ["A", "B"] * 5 + [NA] * 10
+    vectors = np.random.default_rng(0).normal(size=(len(texts), 4)).astype(np.float32)
+    dump_vector_store(get_embeddings_dict(texts, vectors, labels), get_working_dir("project"))
+    return "project"
+
+
+def test_query_strategy_is_saved_with_the_project(project_name):
+    project = SaltProject.load(project_name)
+    assert project.al.query_strategy is None
+    project.set_query_strategy(ENTROPY)
+    project.close()
+
+    assert SaltProject.load(project_name).al.query_strategy == ENTROPY